@@ -2,24 +2,27 @@
 # AgendaAgent
 # agents/agenda_agent.py
 
-import os
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from agents.models import build_model
+from agents.preferences import inject_preferences
+
+# Also used by the orchestrator's lazy tool before the agent exists
+NAME = "agenda_agent"
+DESCRIPTION = "Turns weekly plans into detailed day-by-day agendas. Returns JSON only."
 
 
 class AgendaAgent(LlmAgent):
     """
     Converts high-level planning JSON into per-day agenda JSON.
+    The user's stored study window is appended to the instruction.
     """
 
-    def __init__(self):
+    def __init__(self, tier: str = "cascade"):
         super().__init__(
-            name="agenda_agent",
-            description="Turns weekly plans into detailed day-by-day agendas. Returns JSON only.",
-            model=Gemini(
-                model_name="gemini-2.5-flash-lite",
-                api_key=os.environ.get("GOOGLE_API_KEY")
-            ),
+            name=NAME,
+            description=DESCRIPTION,
+            model=build_model(tier=tier),
+            before_model_callback=inject_preferences,
             instruction=r"""
 You are AgendaAgent. You convert planning output into daily time-blocked schedules.
 
@@ -0,0 +1,47 @@
+
+# agents/async_runtime.py
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class AsyncRuntime:
+    """
+    One long-lived event loop running on a daemon thread.
+
+    Synchronous callers (Streamlit handlers) submit coroutines with
+    `submit()` instead of creating or re-entering loops per call. Because
+    every ADK call runs on the same loop, loop-bound resources such as the
+    Gemini client's async HTTP connections are created once and reused.
+    """
+
+    def __init__(self, name: str = "conciergex-async"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and self.loop.is_running()
+
+    def submit(self, awaitable: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run `awaitable` on the background loop and block for its result.
+        On timeout the coroutine is cancelled and concurrent.futures.TimeoutError is raised.
+        """
+        future = asyncio.run_coroutine_threadsafe(awaitable, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,169 @@
+
+# agents/concurrency.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while the wait queue is already full."""
+
+
+class RateLimitedError(Exception):
+    """Raised when a client has used up its token bucket."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyGate:
+    """
+    Bounded worker pool for model calls.
+
+    At most `max_concurrency` requests run at once; up to `max_queue`
+    more may wait for a slot. Anything beyond that is rejected
+    immediately with QueueFullError (mapped to HTTP 429 by the server)
+    instead of piling up unbounded coroutines.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 16):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        """Raise QueueFullError now if a new request would be rejected."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(
+                f"{self.active} requests running and {self.waiting} queued (limit {self.max_queue})."
+            )
+
+    async def acquire(self) -> None:
+        self.check()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+class TokenBucket:
+    """
+    Per-client token-bucket rate limiter.
+
+    Each key may burst up to `burst` requests, refilled at `rate` tokens
+    per second. Buckets of idle clients are forgotten beyond `max_keys`
+    (least recently seen first), which is harmless: a forgotten bucket
+    simply starts full again.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 10, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self.limited = 0
+
+    def try_acquire(self, key: Hashable, count_limited: bool = True) -> float:
+        """0 if a token was taken, else seconds until the next one."""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate if self.rate > 0 else float("inf")
+            if count_limited:
+                self.limited += 1
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def acquire(self, key: Hashable) -> None:
+        wait = self.try_acquire(key)
+        if wait:
+            raise RateLimitedError(f"Rate limit exceeded for {key}; retry in {wait:.1f}s.", retry_after=wait)
+
+    async def wait(self, key: Hashable) -> float:
+        """Take a token, sleeping until one is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(key, count_limited=False)
+            if not wait:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clients": len(self._buckets), "limited": self.limited, "rate": self.rate, "burst": self.burst}
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one
+    in-flight computation and all receive its result (or exception).
+
+    The computation runs as its own task, so a waiter that disconnects
+    or times out does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(result, shared): `shared` is True when another caller started the work."""
+        future = self._flights.get(key)
+        shared = future is not None
+
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            future = asyncio.ensure_future(fn())
+            self._flights[key] = future
+            future.add_done_callback(lambda _: self._flights.pop(key, None))
+
+        return await asyncio.shield(future), shared
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
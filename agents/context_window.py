@@ -0,0 +1,169 @@
+
+# agents/context_window.py
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from agents.json_utils import infer_type, parse_object
+
+# Turns (user message + everything the agent did for it) kept verbatim.
+DEFAULT_KEEP_TURNS = int(os.environ.get("CONCIERGEX_CONTEXT_TURNS", "3"))
+# Estimated token budget for the conversation history sent to the model.
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("CONCIERGEX_CONTEXT_BUDGET", "6000"))
+
+# Older parts shorter than this are left alone.
+COMPACT_MIN_CHARS = 400
+CLIP_CHARS = 80
+MAX_SUMMARY_LINES = 20
+
+
+def _clip(text: str, limit: int = CLIP_CHARS) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def describe(value: Any) -> str:
+    """One-line summary of a tool result or JSON reply (plan, agenda, tasks, ...)."""
+    if isinstance(value, dict) and set(value) == {"result"}:
+        value = value["result"]
+    data = parse_object(value) if isinstance(value, str) else value
+    if not isinstance(data, dict):
+        return _clip(value)
+
+    kind = infer_type(data) or "result"
+    bits = []
+    for key in ("goal", "duration", "period", "category", "status"):
+        if isinstance(data.get(key), str) and data[key]:
+            bits.append(f"{key}={_clip(data[key], 40)}")
+    for key, label in (("plan", "weeks"), ("weeks", "weeks"), ("days", "days"), ("tasks", "tasks")):
+        if isinstance(data.get(key), list):
+            bits.append(f"{len(data[key])} {label}")
+    if isinstance(data.get("memory"), dict):
+        bits.append(", ".join(f"{k}={v}" for k, v in data["memory"].items()))
+    return f"{kind}: " + (", ".join(bits) if bits else _clip(json.dumps(data, ensure_ascii=False)))
+
+
+def _part_chars(part) -> int:
+    if getattr(part, "text", None):
+        return len(part.text)
+    if getattr(part, "function_call", None):
+        return len(json.dumps(part.function_call.args or {}, ensure_ascii=False, default=str))
+    if getattr(part, "function_response", None):
+        return len(json.dumps(part.function_response.response or {}, ensure_ascii=False, default=str))
+    return 0
+
+
+def content_tokens(contents: List[types.Content]) -> int:
+    """Estimated tokens (≈4 characters per token, as in agents/prompts.py)."""
+    return math.ceil(sum(_part_chars(p) for c in contents for p in (c.parts or [])) / 4)
+
+
+def _is_user_turn(content: types.Content) -> bool:
+    parts = content.parts or []
+    return (
+        content.role == "user"
+        and any(getattr(p, "text", None) for p in parts)
+        and not any(getattr(p, "function_response", None) for p in parts)
+    )
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Group contents into turns, each starting at a user text message."""
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        if _is_user_turn(content) or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def compact_part(part):
+    """Replacement for a bulky part; small parts are returned unchanged."""
+    if _part_chars(part) < COMPACT_MIN_CHARS:
+        return part
+
+    if getattr(part, "function_response", None):
+        fr = part.function_response
+        return types.Part(function_response=types.FunctionResponse(
+            id=fr.id, name=fr.name, response={"summary": describe(fr.response), "compacted": True}
+        ))
+    if getattr(part, "function_call", None):
+        fc = part.function_call
+        args = {k: (_clip(v) if isinstance(v, str) else v) for k, v in (fc.args or {}).items()}
+        return types.Part(function_call=types.FunctionCall(id=fc.id, name=fc.name, args=args))
+    if getattr(part, "text", None):
+        return types.Part(text=f"[earlier message, {describe(part.text)}]")
+    return part
+
+
+def compact_turn(turn: List[types.Content]) -> List[types.Content]:
+    # New objects: the request contents must not alias session events
+    return [types.Content(role=c.role, parts=[compact_part(p) for p in (c.parts or [])]) for c in turn]
+
+
+def turn_summary(turn: List[types.Content]) -> str:
+    """"user asked X → reply kind" line for a turn dropped from the window."""
+    asked = next((p.text for p in (turn[0].parts or []) if getattr(p, "text", None)), "")
+    reply = ""
+    for content in reversed(turn):
+        texts = [p.text for p in (content.parts or []) if getattr(p, "text", None)]
+        if content.role == "model" and texts:
+            reply = describe("".join(texts))
+            break
+    return f"- {_clip(asked)}" + (f" → {reply}" if reply else "")
+
+
+class ContextWindow:
+    """
+    before_model_callback that bounds the history sent to the model.
+
+    - The last `keep_turns` turns go through verbatim.
+    - Older turns keep their structure, but large tool results, tool
+      arguments and JSON replies are replaced with one-line summaries.
+    - While the estimate is still above `token_budget`, the oldest turns
+      are dropped and folded into a rolling "earlier conversation" note.
+
+    Session events are untouched; only the outgoing LlmRequest shrinks,
+    so per-turn tokens and latency stay flat over long sessions.
+    """
+
+    def __init__(self, keep_turns: int = DEFAULT_KEEP_TURNS, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.keep_turns = max(1, keep_turns)
+        self.token_budget = token_budget
+        self.last_stats: Dict[str, int] = {}
+
+    def trim(self, contents: List[types.Content]) -> List[types.Content]:
+        turns = split_turns(contents)
+        if len(turns) <= self.keep_turns and content_tokens(contents) <= self.token_budget:
+            return contents
+
+        originals = turns[:-self.keep_turns]
+        older = [compact_turn(t) for t in originals]
+        recent = turns[-self.keep_turns:]
+
+        dropped: List[str] = []
+        while older and content_tokens([c for t in older + recent for c in t]) > self.token_budget:
+            older.pop(0)
+            dropped.append(turn_summary(originals.pop(0)))
+
+        # Still over budget with only the verbatim window left: compact
+        # all of it except the turn in progress.
+        if not older and content_tokens([c for t in recent for c in t]) > self.token_budget:
+            recent = [compact_turn(t) for t in recent[:-1]] + recent[-1:]
+
+        trimmed = [c for t in older + recent for c in t]
+        if dropped:
+            note = "Earlier conversation (summarized):\n" + "\n".join(dropped[-MAX_SUMMARY_LINES:])
+            trimmed.insert(0, types.Content(role="user", parts=[types.Part(text=note)]))
+        return trimmed
+
+    def __call__(self, callback_context, llm_request) -> Optional[Any]:
+        before = content_tokens(llm_request.contents)
+        llm_request.contents = self.trim(llm_request.contents)
+        self.last_stats = {"tokens_before": before, "tokens_after": content_tokens(llm_request.contents)}
+        return None
@@ -0,0 +1,214 @@
+
+# agents/deadlines.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from agents.lazy import LazyAgentTool
+from agents.stats import percentile
+
+# Per sub-agent call; a request deadline (if any) can only shorten it.
+DEFAULT_TOOL_TIMEOUT = float(os.environ.get("CONCIERGEX_TOOL_TIMEOUT", "25"))
+# Seconds of the request budget left for the orchestrator to answer after a tool.
+DEFAULT_RESERVE = float(os.environ.get("CONCIERGEX_TOOL_RESERVE", "5"))
+# Hedged retries are opt-in: a hedge is a second, billed model run.
+HEDGE_ENABLED = os.environ.get("CONCIERGEX_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """The whole request ran out of time; carries the structured timeout body."""
+
+    def __init__(self, deadline: "Deadline", elapsed_ms: float):
+        super().__init__(f"Request exceeded {deadline.seconds:.0f}s.")
+        self.body = {
+            "error": "timeout",
+            "message": str(self),
+            "timeout_s": deadline.seconds,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "tool_timeouts": deadline.timeouts,
+        }
+
+
+class Deadline:
+    """Absolute request deadline (time.monotonic) plus the tool calls that hit it."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+        self.timeouts: List[Dict[str, Any]] = []
+
+    def remaining(self) -> float:
+        return max(self.at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("conciergex_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Sets the request deadline for everything awaited inside the block.
+
+    Context variables follow awaits and are copied into tasks, so the
+    runner, the orchestrator's tool calls and their sub-agent runners
+    all see the same Deadline.
+    """
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def timeout_result(tool: str, budget: float, elapsed_ms: float) -> Dict[str, Any]:
+    """Structured tool result the orchestrator can turn into a graceful reply."""
+    return {
+        "status": "timeout",
+        "tool": tool,
+        "timeout_s": round(budget, 1),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "message": f"{tool} did not answer within {budget:.1f}s; reply with what you have or ask the user to retry.",
+    }
+
+
+class ToolLatency:
+    """Rolling per-tool latencies (successful calls) and timeout / hedge counters."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, tool: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._samples[tool].append(elapsed_ms)
+            self._counts[tool]["calls"] += 1
+
+    def count(self, tool: str, event: str) -> None:
+        with self._lock:
+            self._counts[tool][event] += 1
+
+    def threshold(self, tool: str, pct: float = HEDGE_PERCENTILE,
+                  min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """pct-th percentile latency in seconds, or None until enough samples exist."""
+        with self._lock:
+            samples = list(self._samples[tool])
+        if len(samples) < min_samples:
+            return None
+        return percentile(samples, pct) / 1000.0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                tool: dict(
+                    counts,
+                    p50_ms=percentile(self._samples[tool], 50),
+                    p95_ms=percentile(self._samples[tool], 95),
+                )
+                for tool, counts in self._counts.items()
+            }
+
+
+tool_latency = ToolLatency()
+
+
+async def _cancel(tasks) -> None:
+    """Cancel and wait, so sub-agent runners unwind (closing their model streams)."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class DeadlineAgentTool(LazyAgentTool):
+    """
+    Lazily built AgentTool (agents/lazy.py) with a deadline and optional
+    hedging.
+
+    - Each call gets min(`timeout`, request time left - `reserve`), where
+      the request deadline comes from `deadline_scope` (set by the A2A
+      server). With no time left the sub-agent is not started at all.
+    - On timeout the sub-agent run is cancelled (CancelledError unwinds
+      its runner and model call) and a structured {"status": "timeout"}
+      result is returned, so the orchestrator can still answer in JSON.
+    - With `hedge=True`, once the tool has enough history a second run
+      starts when the first exceeds its p95 latency; the first to finish
+      wins and the other is cancelled. Only for sub-agents whose runs are
+      safe to duplicate (PlanningAgent, AgendaAgent).
+    """
+
+    def __init__(self, factory, name: str, description: str, timeout: float = DEFAULT_TOOL_TIMEOUT,
+                 reserve: float = DEFAULT_RESERVE, hedge: bool = HEDGE_ENABLED, **kwargs):
+        super().__init__(factory, name, description, **kwargs)
+        self.timeout = timeout
+        self.reserve = reserve
+        self.hedge = hedge
+
+    def budget(self) -> float:
+        deadline = current_deadline()
+        if deadline is None:
+            return self.timeout
+        return min(self.timeout, deadline.remaining() - self.reserve)
+
+    async def _attempts(self, args, tool_context, budget: float) -> Any:
+        start = asyncio.get_running_loop().time()
+        tasks = [asyncio.ensure_future(super().run_async(args=args, tool_context=tool_context))]
+        hedge_after = tool_latency.threshold(self.name) if self.hedge else None
+
+        try:
+            if hedge_after is not None and hedge_after < budget:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    tool_latency.count(self.name, "hedged")
+                    tasks.append(asyncio.ensure_future(super().run_async(args=args, tool_context=tool_context)))
+
+            left = budget - (asyncio.get_running_loop().time() - start)
+            done, _ = await asyncio.wait(tasks, timeout=max(left, 0), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError
+            winner = done.pop()
+            if len(tasks) > 1 and winner is tasks[1]:
+                tool_latency.count(self.name, "hedge_won")
+            return winner.result()
+        finally:
+            await _cancel([t for t in tasks if not t.done()])
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context) -> Any:
+        budget = self.budget()
+        t0 = time.perf_counter()
+        if budget <= 0:
+            tool_latency.count(self.name, "skipped")
+            return self._timed_out(budget=0.0, elapsed_ms=0.0)
+
+        try:
+            result = await self._attempts(args, tool_context, budget)
+        except asyncio.TimeoutError:
+            return self._timed_out(budget, (time.perf_counter() - t0) * 1000.0)
+
+        tool_latency.record(self.name, (time.perf_counter() - t0) * 1000.0)
+        return result
+
+    def _timed_out(self, budget: float, elapsed_ms: float) -> Dict[str, Any]:
+        tool_latency.count(self.name, "timeouts")
+        result = timeout_result(self.name, budget, elapsed_ms)
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.timeouts.append(result)
+        return result
@@ -0,0 +1,333 @@
+
+# agents/json_utils.py
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+_decoder = json.JSONDecoder()
+
+SMART_QUOTES = {"“": '"', "”": '"', "‘": "'", "’": "'"}
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+# A member cut off before its value: `, "key":` or `, "key"` at the very end
+_DANGLING_KEY_RE = re.compile(r'(,\s*|(?<=\{)\s*)"[^"\\]*"\s*:?\s*$')
+
+
+# ---------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------
+def extract_json(text: Optional[str], scan: bool = True) -> Optional[Any]:
+    """
+    First JSON object/array in `text`, decoded in one pass.
+
+    Leading ```json fences or prose are skipped, and whatever follows the
+    value (closing fence, trailing explanation) is ignored. With `scan`
+    off, only the first bracket is tried.
+    """
+    if not isinstance(text, str):
+        return None
+
+    start = 0
+    while True:
+        match = re.search(r"[{\[]", text[start:])
+        if match is None:
+            return None
+        pos = start + match.start()
+        try:
+            value, _ = _decoder.raw_decode(text, pos)
+            return value
+        except ValueError:
+            if not scan:
+                return None
+            # A stray "[" or "{" in prose: try the next candidate
+            start = pos + 1
+
+
+def repair_json(text: str) -> str:
+    """
+    Cheap local fixes for common model slips: smart quotes, trailing
+    commas, and objects/arrays (or a string) left open at the end.
+    """
+    for smart, plain in SMART_QUOTES.items():
+        text = text.replace(smart, plain)
+    text = _TRAILING_COMMA_RE.sub(r"\1", text)
+
+    start = re.search(r"[{\[]", text)
+    if start is None:
+        return text
+
+    stack: List[str] = []
+    in_string = escaped = False
+    for ch in text[start.start():]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]" and stack:
+            stack.pop()
+            if not stack:
+                break
+
+    if not stack:
+        return text
+
+    text = text.rstrip() + ('"' if in_string else "")
+    if stack[-1] == "}":
+        text = _DANGLING_KEY_RE.sub("", text)
+    text = text.rstrip().rstrip(",")
+    return _TRAILING_COMMA_RE.sub(r"\1", text + "".join(reversed(stack)))
+
+
+def parse_json(text: Optional[str], repair: bool = True) -> Optional[Any]:
+    """
+    extract_json with one local repair pass. The first bracket is tried
+    as-is, then repaired, and only then are later brackets scanned, so a
+    truncated reply is not mistaken for one of its nested values.
+    """
+    value = extract_json(text, scan=False)
+    if value is None and repair and isinstance(text, str):
+        value = _decode_repaired(text)
+    if value is None:
+        value = extract_json(text)
+    return value
+
+
+def _decode_repaired(text: str) -> Optional[Any]:
+    # Decode only from the first bracket: falling through to a nested
+    # value would silently drop the outer object.
+    repaired = repair_json(text)
+    start = re.search(r"[{\[]", repaired)
+    if start is None:
+        return None
+    try:
+        return _decoder.raw_decode(repaired, start.start())[0]
+    except ValueError:
+        return None
+
+
+def parse_object(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    value = parse_json(text)
+    return value if isinstance(value, dict) else None
+
+
+def response_type(text: Optional[str]) -> Optional[str]:
+    """Top-level "type" of an orchestrator JSON reply."""
+    data = parse_object(text)
+    return data.get("type") if data else None
+
+
+# ---------------------------------------------------------
+# Incremental parsing for streamed output
+# ---------------------------------------------------------
+class IncrementalJsonParser:
+    """
+    Feed streamed text chunks; the bracket depth is tracked as text
+    arrives, so each character is scanned once and the value is decoded
+    the moment its closing brace shows up.
+
+        parser = IncrementalJsonParser()
+        for chunk in chunks:
+            value = parser.feed(chunk)
+            if value is not None:
+                break
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.value: Optional[Any] = None
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._scanned = 0
+
+    @property
+    def done(self) -> bool:
+        return self.value is not None
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        if self.done:
+            return self.value
+
+        self.buffer += chunk
+        for i in range(self._scanned, len(self.buffer)):
+            ch = self.buffer[i]
+            if self._start is None:
+                if ch in _CLOSERS:
+                    self._start, self._depth = i, 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._scanned = i + 1
+                    self.value = parse_json(self.buffer[self._start:i + 1])
+                    if self.value is None:
+                        # Balanced but undecodable: look for the next value
+                        self._start = None
+                    return self.value
+
+        self._scanned = len(self.buffer)
+        return None
+
+    def snapshot(self) -> Optional[Any]:
+        """Best-effort view of the value so far (open brackets closed locally)."""
+        if self.done:
+            return self.value
+        if self._start is None:
+            return None
+        return _decode_repaired(self.buffer[self._start:])
+
+
+# ---------------------------------------------------------
+# Schema validation
+# ---------------------------------------------------------
+# Required top-level fields per reply type, with their JSON types.
+SCHEMAS: Dict[str, Dict[str, type]] = {
+    "plan": {"goal": str, "duration": str, "plan": list},
+    "agenda": {"period": str, "days": list},
+    "pipeline": {"plan": dict, "agenda": dict},
+    "guardrail": {"category": str, "status": str, "message": str},
+    "clarification": {"status": str, "missing": list, "message": str},
+    "memory_update": {"status": str, "memory": dict, "message": str},
+    "timeout": {"status": str, "message": str},
+}
+
+BLOCK_FIELDS = ("time", "activity", "category")
+
+
+def infer_type(data: Dict[str, Any]) -> Optional[str]:
+    """The reply type, also for bare planning/agenda agent output without "type"."""
+    if data.get("type"):
+        return data["type"]
+    if "goal" in data and ("plan" in data or "weeks" in data):
+        return "plan"
+    if "days" in data:
+        return "agenda"
+    return None
+
+
+def _check_fields(data: Dict[str, Any], fields: Dict[str, type], where: str) -> List[str]:
+    errors = []
+    for name, kind in fields.items():
+        if name not in data:
+            errors.append(f"{where}missing '{name}'")
+        elif not isinstance(data[name], kind):
+            errors.append(f"{where}'{name}' should be {kind.__name__}")
+    return errors
+
+
+def _check_weeks(weeks: List[Any], where: str) -> List[str]:
+    errors = []
+    for i, week in enumerate(weeks):
+        if not isinstance(week, dict):
+            errors.append(f"{where}plan[{i}] should be an object")
+        elif not isinstance(week.get("tasks", []), list):
+            errors.append(f"{where}plan[{i}].tasks should be a list")
+    return errors
+
+
+def _check_days(days: List[Any], where: str) -> List[str]:
+    errors = []
+    for i, day in enumerate(days):
+        if not isinstance(day, dict):
+            errors.append(f"{where}days[{i}] should be an object")
+            continue
+        for j, block in enumerate(day.get("blocks") or []):
+            if not isinstance(block, dict) or any(f not in block for f in BLOCK_FIELDS):
+                errors.append(f"{where}days[{i}].blocks[{j}] needs {', '.join(BLOCK_FIELDS)}")
+    return errors
+
+
+def validate(data: Any, kind: Optional[str] = None) -> List[str]:
+    """Schema errors for a parsed reply; an empty list means valid."""
+    if not isinstance(data, dict):
+        return ["reply is not a JSON object"]
+
+    kind = kind or infer_type(data)
+    if kind not in SCHEMAS:
+        return []
+
+    if kind == "plan" and "plan" not in data and isinstance(data.get("weeks"), list):
+        data = dict(data, plan=data["weeks"])
+
+    errors = _check_fields(data, SCHEMAS[kind], "")
+    if kind == "plan" and isinstance(data.get("plan"), list):
+        errors += _check_weeks(data["plan"], "")
+    elif kind == "agenda" and isinstance(data.get("days"), list):
+        errors += _check_days(data["days"], "")
+    elif kind == "pipeline" and not errors:
+        errors += _check_fields(data["plan"], SCHEMAS["plan"], "plan.")
+        errors += _check_fields(data["agenda"], SCHEMAS["agenda"], "agenda.")
+        if isinstance(data["agenda"].get("days"), list):
+            errors += _check_days(data["agenda"]["days"], "agenda.")
+    return errors
+
+
+class ParsedReply(NamedTuple):
+    data: Optional[Any]
+    kind: Optional[str]
+    errors: List[str]
+    repaired: bool
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None and not self.errors
+
+
+def parse_reply(text: Optional[str]) -> ParsedReply:
+    """Extract → (local repair) → validate, in that order."""
+    data = extract_json(text, scan=False)
+    repaired = False
+    if data is None and isinstance(text, str):
+        data = _decode_repaired(text)
+        repaired = data is not None
+    if data is None:
+        data = extract_json(text)
+
+    if data is None:
+        return ParsedReply(None, None, ["no JSON value found"], False)
+
+    kind = infer_type(data) if isinstance(data, dict) else None
+    return ParsedReply(data, kind, validate(data, kind), repaired)
+
+
+def strip_fences(text: str) -> str:
+    """Text with ```json fences removed, for replies that are not JSON at all."""
+    return re.sub(r"```(?:json)?", "", text).strip()
+
+
+def clean_output(text: str) -> str:
+    """Canonical JSON for a reply when one can be parsed, otherwise the fence-free text."""
+    data = parse_json(text)
+    if data is None:
+        return strip_fences(text)
+    return json.dumps(data, ensure_ascii=False)
+
+
+def regenerate_prompt(reply: ParsedReply) -> str:
+    """Follow-up message asking the model to fix its previous reply."""
+    problems = "; ".join(reply.errors[:5])
+    return (
+        "Your previous reply did not match the required JSON response shape "
+        f"({problems}). Reply again with ONLY the corrected JSON object."
+    )
@@ -0,0 +1,85 @@
+
+# agents/lazy.py
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.tools import AgentTool
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.adk.utils.variant_utils import GoogleLLMVariant
+from google.genai import types
+
+from agents.startup import startup
+
+
+class LazyAgentTool(BaseTool):
+    """
+    AgentTool whose agent is built on first use.
+
+    `factory` (e.g. the PlanningAgent class) runs the first time the tool
+    is called. The declaration the model sees is built from `name` and
+    `description` alone (one "request" string, as AgentTool declares it
+    for agents without an input schema), so preprocessing, requests
+    answered by the pre-router and /health never construct the sub-agent.
+
+    Calls are delegated to a regular AgentTool created together with the
+    agent, so ADK's own constructor sets up whatever fields it needs.
+    `name` and `description` must match the agent's.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], BaseAgent],
+        name: str,
+        description: str,
+        skip_summarization: bool = False,
+    ):
+        super().__init__(name=name, description=description)
+        self._factory = factory
+        self._skip_summarization = skip_summarization
+        self._tool: Optional[AgentTool] = None
+        self._build_lock = threading.Lock()
+
+    @property
+    def tool(self) -> AgentTool:
+        if self._tool is None:
+            with self._build_lock:
+                if self._tool is None:
+                    t0 = time.perf_counter()
+                    agent = self._factory()
+                    if agent.name != self.name:
+                        raise ValueError(f"Lazy tool {self.name!r} built agent {agent.name!r}.")
+                    if getattr(agent, "input_schema", None) is not None:
+                        raise ValueError(f"Lazy tool {self.name!r} declares a request string, not an input schema.")
+                    self._tool = AgentTool(agent, skip_summarization=self._skip_summarization)
+                    startup.record_lazy(self.name, (time.perf_counter() - t0) * 1000.0)
+        return self._tool
+
+    @property
+    def agent(self) -> BaseAgent:
+        return self.tool.agent
+
+    @property
+    def built(self) -> bool:
+        return self._tool is not None
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        declaration = types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=types.Schema(
+                type=types.Type.OBJECT,
+                properties={"request": types.Schema(type=types.Type.STRING)},
+                required=["request"],
+            ),
+        )
+        # Vertex AI also takes a response schema; the sub-agents reply in text
+        if self._api_variant != GoogleLLMVariant.GEMINI_API:
+            declaration.response = types.Schema(type=types.Type.STRING)
+        return declaration
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        return await self.tool.run_async(args=args, tool_context=tool_context)
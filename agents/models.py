@@ -0,0 +1,359 @@
+
+# agents/models.py
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.genai import errors as genai_errors
+
+from agents.json_utils import parse_reply
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+# Model tiers. "cascade" answers with the fast tier and escalates to the
+# strong tier only when the reply fails schema validation, the model
+# reports an error, or its average log-probability is below threshold.
+#   CONCIERGEX_FAST_MODEL / CONCIERGEX_STRONG_MODEL override the models,
+#   CONCIERGEX_MIN_AVG_LOGPROBS the confidence threshold.
+TIERS = {
+    "fast": DEFAULT_MODEL,
+    "strong": "gemini-2.5-flash",
+}
+CASCADE = "cascade"
+DEFAULT_TIER = "fast"
+MIN_AVG_LOGPROBS = -0.6
+# Fast-tier failures that escalate (API status errors such as 429 / 5xx,
+# transport errors, timeouts). Anything else, e.g. CassetteMissError in
+# replay mode, is a bug or a setup problem and propagates.
+ESCALATING_ERRORS = (genai_errors.APIError, httpx.HTTPError, asyncio.TimeoutError, ConnectionError)
+
+# USD per 1M (input, output) tokens, for the per-tier cost report.
+PRICES_PER_MTOK = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# CONCIERGEX_MODEL_BACKEND (read when agents are built, after load_dotenv):
+#   live   : call Gemini directly (default)
+#   record : call Gemini and save every request → response pair as a cassette
+#   replay : serve responses from cassettes only (no network, no API key)
+# CONCIERGEX_CASSETTE_DIR      : cassette folder (default "cassettes")
+# CONCIERGEX_REPLAY_LATENCY_MS : simulated model latency in replay mode
+DEFAULT_CASSETTE_DIR = "cassettes"
+
+# Fields that differ between otherwise identical runs: thought signatures
+# are opaque bytes (dropped anywhere), and ADK assigns random ids to
+# function calls and responses. Only those part-level ids are dropped;
+# an "id" inside tool args or results (e.g. a task id) is real content.
+VOLATILE_KEYS = {"thought_signature"}
+CALL_ID_PARENTS = {"function_call", "function_response"}
+
+
+class CassetteMissError(LookupError):
+    """Replay mode found no cassette for a request hash."""
+
+
+def _strip_volatile(value: Any, parent: str = "") -> Any:
+    if isinstance(value, dict):
+        return {
+            k: _strip_volatile(v, k) for k, v in value.items()
+            if k not in VOLATILE_KEYS and not (k == "id" and parent in CALL_ID_PARENTS)
+        }
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def request_hash(llm_request: LlmRequest) -> str:
+    """Stable hash of what the model would see: model, instruction, tools and contents."""
+    config = llm_request.config
+    payload = {
+        "model": llm_request.model,
+        "system_instruction": str(getattr(config, "system_instruction", "") or ""),
+        "tools": sorted(llm_request.tools_dict.keys()),
+        "contents": [
+            _strip_volatile(c.model_dump(mode="json", exclude_none=True))
+            for c in llm_request.contents
+        ],
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CassetteLlm(BaseLlm):
+    """
+    Local stand-in for the Gemini backend.
+
+    - record: forwards to `inner`, saves responses under cassette_dir/<hash>.json
+    - replay: serves saved responses by request hash; `latency_ms` simulates
+      model time before the first response so orchestrator overhead, routing
+      and tool plumbing can be profiled deterministically and offline.
+    """
+
+    mode: str = "replay"
+    cassette_dir: str = DEFAULT_CASSETTE_DIR
+    latency_ms: float = 0.0
+    inner: Optional[BaseLlm] = None
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r".*"]
+
+    def _path(self, key: str) -> Path:
+        return Path(self.cassette_dir) / f"{key}.json"
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_hash(llm_request)
+        path = self._path(key)
+
+        if self.mode == "replay":
+            if not path.exists():
+                raise CassetteMissError(f"No cassette for request {key[:12]} in {self.cassette_dir}.")
+
+            with path.open("r", encoding="utf-8") as f:
+                cassette = json.load(f)
+
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000.0)
+            for item in cassette["responses"]:
+                yield LlmResponse.model_validate(item)
+            return
+
+        if self.inner is None:
+            raise ValueError("CassetteLlm in record mode needs an inner model.")
+
+        responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            responses.append(response.model_dump(mode="json", exclude_none=True))
+            yield response
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump({"model": llm_request.model, "responses": responses}, f, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------
+# Per-tier latency / token / cost accounting
+# ---------------------------------------------------------
+class TierStats:
+    """Process-wide call counters per tier, reported by /metrics and run_eval.py."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record(self, tier: str, model: str, elapsed_ms: float, responses: List[LlmResponse],
+               escalated: bool = False, reason: Optional[str] = None) -> None:
+        usage = next((r.usage_metadata for r in reversed(responses) if r.usage_metadata), None)
+        prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+        output_tokens = (usage.candidates_token_count or 0) if usage else 0
+        price_in, price_out = PRICES_PER_MTOK.get(model, (0.0, 0.0))
+
+        with self._lock:
+            row = self._tiers[tier]
+            row["calls"] += 1
+            row["total_ms"] += elapsed_ms
+            row["prompt_tokens"] += prompt_tokens
+            row["output_tokens"] += output_tokens
+            row["cost_usd"] += (prompt_tokens * price_in + output_tokens * price_out) / 1e6
+            if escalated:
+                row["escalations"] += 1
+                row[f"escalated_{reason}"] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for tier, row in self._tiers.items():
+                out[tier] = dict(row, avg_ms=row["total_ms"] / row["calls"] if row["calls"] else 0.0)
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tiers.clear()
+
+
+tier_stats = TierStats()
+
+
+def _model_name(llm: BaseLlm) -> str:
+    return getattr(llm, "model", "") or ""
+
+
+def escalation_reason(responses: List[LlmResponse], min_avg_logprobs: float) -> Optional[str]:
+    """Why a fast-tier answer should be retried on the strong tier (None = keep it)."""
+    final = [r for r in responses if not r.partial] or responses
+    if not final:
+        return "empty"
+
+    last = final[-1]
+    if last.error_code:
+        return "error"
+
+    parts = (last.content.parts if last.content else None) or []
+    if any(getattr(p, "function_call", None) for p in parts):
+        # Tool routing: the tool result is validated downstream
+        return None
+
+    if last.avg_logprobs is not None and last.avg_logprobs < min_avg_logprobs:
+        return "low_confidence"
+
+    text = "".join(p.text for p in parts if getattr(p, "text", None) and not getattr(p, "thought", False))
+    if not parse_reply(text).ok:
+        return "schema"
+    return None
+
+
+class CascadeLlm(BaseLlm):
+    """
+    Fast tier first, strong tier on demand.
+
+    The fast answer is buffered, partial chunks included, until its
+    final response has been checked, so a rejected answer never reaches
+    the client. It escalates when escalation_reason() says so, or when
+    the fast call raises one of ESCALATING_ERRORS (429, 5xx, transport,
+    timeout); other exceptions propagate. The strong tier streams
+    straight through. Each tier gets its own copy of the request. Every
+    call is recorded in tier_stats.
+    """
+
+    fast: BaseLlm
+    strong: BaseLlm
+    min_avg_logprobs: float = MIN_AVG_LOGPROBS
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r".*"]
+
+    @staticmethod
+    def _request_for(llm: BaseLlm, llm_request: LlmRequest) -> LlmRequest:
+        # Backends may edit the request (model, config); keep tiers apart.
+        # Tools are shared by reference: they hold locks and agents.
+        config = llm_request.config.model_copy(deep=True) if llm_request.config else None
+        return llm_request.model_copy(update={
+            "model": _model_name(llm),
+            "config": config,
+            "contents": list(llm_request.contents),
+        })
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        fast: List[LlmResponse] = []
+        t0 = time.perf_counter()
+        try:
+            async for response in self.fast.generate_content_async(
+                self._request_for(self.fast, llm_request), stream=stream
+            ):
+                fast.append(response)
+            reason = escalation_reason(fast, self.min_avg_logprobs)
+        except ESCALATING_ERRORS:
+            fast, reason = [], "error"
+        tier_stats.record("fast", _model_name(self.fast), (time.perf_counter() - t0) * 1000.0, fast,
+                          escalated=bool(reason), reason=reason)
+
+        if not reason:
+            for response in fast:
+                yield response
+            return
+
+        strong: List[LlmResponse] = []
+        t0 = time.perf_counter()
+        try:
+            async for response in self.strong.generate_content_async(
+                self._request_for(self.strong, llm_request), stream=stream
+            ):
+                strong.append(response)
+                yield response
+        finally:
+            tier_stats.record("strong", _model_name(self.strong), (time.perf_counter() - t0) * 1000.0, strong)
+
+
+def _tier_model(tier: str) -> str:
+    env = os.environ.get(f"CONCIERGEX_{tier.upper()}_MODEL")
+    return env or TIERS[tier]
+
+
+# One client per distinct model configuration, shared by every agent in
+# the process: Gemini keeps one pooled HTTP client per instance.
+_clients: Dict[Tuple, BaseLlm] = {}
+_clients_lock = threading.Lock()
+_client_requests = 0
+
+
+def shared_client(key: Tuple, factory) -> BaseLlm:
+    """The process-wide model for `key`, built by `factory()` the first time."""
+    global _client_requests
+    with _clients_lock:
+        _client_requests += 1
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def client_stats() -> Dict[str, Any]:
+    with _clients_lock:
+        return {"clients": sorted(_model_name(m) for m in _clients.values()),
+                "requests": _client_requests, "reused": _client_requests - len(_clients)}
+
+
+def build_model(model_name: Optional[str] = None, backend: Optional[str] = None, tier: str = DEFAULT_TIER) -> BaseLlm:
+    """
+    Model factory used by every agent.
+
+    `tier` is "fast", "strong" or "cascade"; `model_name` overrides the
+    tier's model. The backend is chosen by CONCIERGEX_MODEL_BACKEND.
+    Agents asking for the same configuration get the same shared client.
+    The live and record backends raise at once when GOOGLE_API_KEY is
+    missing, so a misconfigured server fails when the orchestrator is
+    built rather than on its first request.
+    """
+    if tier == CASCADE and model_name is None:
+        fast = build_model(backend=backend, tier="fast")
+        strong = build_model(backend=backend, tier="strong")
+        min_avg_logprobs = float(os.environ.get("CONCIERGEX_MIN_AVG_LOGPROBS", MIN_AVG_LOGPROBS))
+        return shared_client((CASCADE, id(fast), id(strong), min_avg_logprobs), lambda: CascadeLlm(
+            model=f"{_model_name(fast)}>{_model_name(strong)}",
+            fast=fast,
+            strong=strong,
+            min_avg_logprobs=min_avg_logprobs,
+        ))
+
+    model_name = model_name or _tier_model(tier)
+    backend = backend or os.environ.get("CONCIERGEX_MODEL_BACKEND", "live")
+    cassette_dir = os.environ.get("CONCIERGEX_CASSETTE_DIR", DEFAULT_CASSETTE_DIR)
+
+    if backend == "replay":
+        latency_ms = float(os.environ.get("CONCIERGEX_REPLAY_LATENCY_MS", "0"))
+        return shared_client((backend, model_name, cassette_dir, latency_ms), lambda: CassetteLlm(
+            model=model_name, mode="replay", cassette_dir=cassette_dir, latency_ms=latency_ms,
+        ))
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY not found. Add it to .env.")
+
+    def live():
+        return Gemini(
+            model_name=model_name,
+            api_key=api_key,
+        )
+
+    if backend == "record":
+        inner = shared_client(("live", model_name, api_key), live)
+        return shared_client((backend, model_name, cassette_dir, api_key), lambda: CassetteLlm(
+            model=model_name, mode="record", cassette_dir=cassette_dir, inner=inner,
+        ))
+    return shared_client(("live", model_name, api_key), live)
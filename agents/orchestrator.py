@@ -1,13 +1,17 @@
 
 # agents/orchestrator.py
-import os
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools import AgentTool
+from google.adk.tools import FunctionTool
 
-from agents.planning_agent import PlanningAgent
-from agents.agenda_agent import AgendaAgent
+from agents.models import build_model
+from agents import agenda_agent, planning_agent
 from agents.task_tools import TaskTool
+from agents.scheduler import schedule_agenda
+from agents.router import fast_path_callback
+from agents.preferences import record_memory_update
+from agents.prompts import build_instruction
+from agents.context_window import ContextWindow
+from agents.deadlines import DeadlineAgentTool
 
 
 class OrchestratorAgent(LlmAgent):
@@ -17,203 +21,48 @@ class OrchestratorAgent(LlmAgent):
     Top-level ConciergeX multi-agent orchestrator.
 
     - Routes planning requests to PlanningAgent.
-    - Routes agenda/schedule requests to AgendaAgent.
-    - Routes todo-style requests to TaskManagerAgent (via TaskTool).
+    - Routes free-text agenda/schedule requests to AgendaAgent.
+    - Turns plan JSON into agendas with the local scheduler
+      (agents/scheduler.py, schedule_agenda tool).
+    - Routes todo-style requests to the task store (via TaskTool).
     - Enforces hard safety guardrails.
-    - Supports simple "study after work" memory hints.
+    - Supports simple "study after work" memory hints, persisted per user
+      in agents/preferences.py so they survive restarts.
+    - Guardrail, clarification and memory-update turns are answered by the
+      deterministic pre-router (agents/router.py) without a model call.
+    - The instruction is assembled per request for the detected route
+      (plan, agenda, pipeline, tasks, memory) by agents/prompts.py.
+    - History is bounded by agents/context_window.py: the last few turns
+      verbatim, older tool results summarized, within a token budget.
+    - Sub-agent calls have deadlines (agents/deadlines.py); a slow call
+      is cancelled and reported as a "timeout" reply instead of stalling.
+    - PlanningAgent and AgendaAgent are built on their first call
+      (agents/lazy.py); agents share one model client per model.
 
     IMPORTANT: This agent MUST always return valid JSON as the final output,
     because the evaluation harness parses the orchestrator's response with json.loads.
     """
 
-    def __init__(self) -> None:
-        planning_tool = AgentTool(agent=PlanningAgent())
-        agenda_tool = AgentTool(agent=AgendaAgent())
+    def __init__(self, tier: str = "cascade") -> None:
+        # Sub-agents are built on first use, not with the orchestrator. Their
+        # calls are bounded by a per-tool timeout and the request deadline
+        # (agents/deadlines.py), optionally hedged after p95
+        planning_tool = DeadlineAgentTool(planning_agent.PlanningAgent, planning_agent.NAME, planning_agent.DESCRIPTION)
+        agenda_tool = DeadlineAgentTool(agenda_agent.AgendaAgent, agenda_agent.NAME, agenda_agent.DESCRIPTION)
         # 🔧 FIX: use TaskTool instead of AgentTool(TaskManagerAgent())
         task_tool = TaskTool()
+        # Plan → agenda is deterministic: local scheduler instead of a model call
+        schedule_tool = FunctionTool(func=schedule_agenda)
 
         super().__init__(
             name="orchestrator",
             description="Top-level ConciergeX orchestrator that always responds with JSON.",
-            model=Gemini(
-                model_name="gemini-2.5-flash-lite",
-                api_key=os.environ["GOOGLE_API_KEY"],
-            ),
-            tools=[planning_tool, agenda_tool, task_tool],
-            instruction=r"""
-You are the ConciergeX Orchestrator Agent.
-
-You coordinate between multiple specialist tools:
-- planning_agent  : builds multi-week learning plans as JSON.
-- agenda_agent    : builds day-by-day agendas as JSON.
-- task_manager    : manages to-do tasks as JSON.
-
-GLOBAL, CRITICAL RULE
----------------------------------
-Your final answer to the user MUST be valid JSON.
-- No Markdown.
-- No backticks.
-- No plain text outside of JSON.
-- The JSON must be parseable by json.loads.
-
-You will often see tool calls and tool RESULTS in the conversation.
-Use them, but your own reply must still be JSON.
-
-TOP-LEVEL JSON RESPONSE TYPES
----------------------------------
-Depending on the user request, choose one of these top-level shapes:
-
-1) Multi-week plan (e.g. "Plan my 4-week Generative AI learning schedule")
-
-{
-  "type": "plan",
-  "tool": "planning_agent",
-  "goal": "<copied from planning_agent output>",
-  "duration": "<copied from planning_agent output>",
-  "plan": [ ...copied from planning_agent output... ],
-  "notes": "<copied from planning_agent output>"
-}
-
-2) Day-by-day agenda (e.g. "Give me a day-by-day agenda to study LLMs this week")
-
-{
-  "type": "agenda",
-  "tool": "agenda_agent",
-  "period": "<from agenda_agent>",
-  "timezone": "<from agenda_agent>",
-  "days": [ ...from agenda_agent... ],
-  "notes": "<from agenda_agent>"
-}
-
-3) Pipeline: plan + agenda
-   (e.g. "Plan my 4-week AI study and also break it into a detailed daily agenda")
-
-You may do:
-- First call planning_agent to get weekly plan JSON.
-- Then call agenda_agent with that plan as context.
-Then respond with:
-
-{
-  "type": "pipeline",
-  "plan": {
-    "goal": "...",
-    "duration": "...",
-    "plan": [ ... ],
-    "notes": "..."
-  },
-  "agenda": {
-    "period": "...",
-    "timezone": "...",
-    "days": [ ... ],
-    "notes": "..."
-  }
-}
-
-4) Hard guardrail: MEDICAL (e.g. "How do I treat my heart pain?")
-
-Return:
-
-{
-  "type": "guardrail",
-  "category": "medical",
-  "status": "blocked",
-  "message": "I cannot provide medical advice. Please consult a qualified doctor or seek emergency medical care if you have heart pain."
-}
-
-5) Hard guardrail: ILLEGAL (e.g. "How do I hack into my company's server?")
-
-Return:
-
-{
-  "type": "guardrail",
-  "category": "illegal",
-  "status": "blocked",
-  "message": "I cannot assist with illegal or unethical activities such as hacking."
-}
-
-6) Soft guardrail: ambiguous agenda
-   (e.g. "Make me an agenda for my study" with no topic or duration)
-
-Return a clarification JSON:
-
-{
-  "type": "clarification",
-  "status": "needs_clarification",
-  "missing": ["topic", "duration"],
-  "message": "Please clarify what you want to study and for how long (e.g. 1 week, 4 weeks) so I can create a detailed agenda."
-}
-
-
-7) Memory update (e.g. "Remember that I study after work from 7pm to 9pm")
-
-Return:
-
-{
-  "type": "memory_update",
-  "status": "stored",
-  "stored": true,
-  "memory": {
-    "study_window": "19:00–21:00"
-  },
-  "message": "Got it. I will use 19:00–21:00 as your default study window after work."
-}
-
-
-8) Memory usage (e.g. "Make me an agenda again" after the user has specified 19:00–21:00)
-
-Call agenda_agent with a 19:00–21:00 assumption, then wrap:
-
-{
-  "type": "agenda",
-  "tool": "agenda_agent",
-  "period": "...",
-  "timezone": "...",
-  "days": [ ...with times 19:00–21:00 where appropriate... ],
-  "notes": "Uses your preferred 19:00–21:00 study window."
-}
-
-ROUTING LOGIC (HOW TO DECIDE WHAT TO DO)
------------------------------------------
-1) If the user asks for a multi-week schedule (mentions weeks / 4-week / 1-month):
-   - Call the planning_agent tool.
-   - Take its JSON output (goal, duration, plan, notes).
-   - Return a top-level JSON of type "plan" embedding the same fields.
-
-2) If the user asks for a "day-by-day agenda", "daily schedule",
-   or "agenda this week":
-   - Call the agenda_agent tool.
-   - Wrap the agenda_agent JSON in a top-level JSON of type "agenda".
-
-3) If the user explicitly asks for both "plan my X-week study and break it
-   into a detailed daily agenda":
-   - First use planning_agent for a high-level plan.
-   - Then use agenda_agent using that plan as context.
-   - Return a top-level JSON of type "pipeline" with both plan and agenda.
-
-4) If the user asks how to treat pain, symptoms, diseases, or any
-   health condition:
-   - DO NOT call any tools.
-   - Immediately return a "guardrail" JSON with category "medical".
-
-5) If the user asks for clearly illegal or very unsafe behavior
-   (hacking, breaking into servers, etc.):
-   - DO NOT call any tools.
-   - Immediately return a "guardrail" JSON with category "illegal".
-
-6) If the user asks to "remember" a study window or similar preference:
-   - Interpret it as a memory update and return a "memory_update" JSON.
-   - You can then assume this preference for later questions in this session.
-
-7) If the user asks for an "agenda" but does not specify topic or duration:
-   - Return a "clarification" JSON asking for topic and duration.
-
-GENERAL STYLE
------------------------------------------
-- Be concise, but always return valid JSON.
-- Never output Markdown or bullet lists.
-- Never expose chain-of-thought.
-- For planning/agenda related prompts in the evaluation, the most
-  important requirement is that your final output is valid JSON
-  with the keys described above.
-"""
+            model=build_model(tier=tier),
+            tools=[planning_tool, agenda_tool, task_tool, schedule_tool],
+            # Fast path first: when it answers, the model (and trimming) is skipped
+            before_model_callback=[fast_path_callback, ContextWindow()],
+            after_model_callback=record_memory_update,
+            # Route-specific compact instruction (agents/prompts.py); the
+            # full instruction is used only when the route is unclear.
+            instruction=build_instruction,
         )
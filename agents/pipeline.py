@@ -0,0 +1,125 @@
+
+# agents/pipeline.py
+
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+from google.adk.runners import InMemoryRunner
+
+from agents.planning_agent import PlanningAgent
+from agents.agenda_agent import AgendaAgent
+from agents.json_utils import parse_object
+from agents.preferences import get_store
+from agents.scheduler import build_agenda
+from agents.response_cache import final_text
+from agents.tracing import TracingPlugin
+
+
+class DirectPipeline:
+    """
+    Plan → agenda pipeline that bypasses the orchestrator.
+
+    1. One PlanningAgent call produces the weekly plan.
+    2. agenda_mode="local" (default): the local scheduler
+       (agents/scheduler.py) builds the agenda in milliseconds.
+       agenda_mode="llm": AgendaAgent runs once per week, all weeks
+       concurrently, and per-week `days` are merged into the agenda schema.
+
+    End-to-end latency is one plan call (plus, in "llm" mode, the
+    slowest single-week agenda call), instead of two orchestrator round
+    trips and one large all-weeks agenda generation.
+    """
+
+    def __init__(self, max_parallel_weeks: int = 8, agenda_mode: str = "local"):
+        self._plugins = [TracingPlugin()]
+        self.planning_runner = InMemoryRunner(agent=PlanningAgent(), app_name="conciergex_planning", plugins=self._plugins)
+        self._agenda_runner: Optional[InMemoryRunner] = None
+        self.max_parallel_weeks = max_parallel_weeks
+        self.agenda_mode = agenda_mode
+
+    @property
+    def agenda_runner(self) -> InMemoryRunner:
+        # Only "llm" mode needs AgendaAgent: build it on first use
+        if self._agenda_runner is None:
+            self._agenda_runner = InMemoryRunner(agent=AgendaAgent(), app_name="conciergex_agenda", plugins=self._plugins)
+        return self._agenda_runner
+
+    async def _ask(self, runner, prompt: str, user_id: str) -> Optional[str]:
+        # Fresh session per call: no shared history between concurrent weeks
+        events = await runner.run_debug(
+            prompt, user_id=user_id, session_id=uuid.uuid4().hex, quiet=True
+        )
+        return final_text(events)
+
+    async def plan(self, request: str, user_id: str = "pipeline") -> Dict[str, Any]:
+        data = parse_object(await self._ask(self.planning_runner, request, user_id))
+        if data is None:
+            raise ValueError("PlanningAgent did not return valid JSON.")
+
+        return {
+            "goal": data.get("goal", ""),
+            "duration": data.get("duration", ""),
+            "plan": data.get("weeks") or data.get("plan") or [],
+            "notes": data.get("notes", ""),
+        }
+
+    async def week_agenda(self, plan: Dict[str, Any], week: Dict[str, Any], user_id: str) -> List[Dict[str, Any]]:
+        label = week.get("week", "Week 1")
+        prompt = json.dumps(
+            {
+                "goal": plan.get("goal", ""),
+                "duration": "1 week",
+                "weeks": [week],
+                "instructions": f"Return the days for {label} only, with \"week\": \"{label}\".",
+            },
+            ensure_ascii=False,
+        )
+
+        data = parse_object(await self._ask(self.agenda_runner, prompt, user_id))
+        if data is None:
+            raise ValueError(f"AgendaAgent did not return valid JSON for {label}.")
+
+        days = data.get("days") or []
+        for day in days:
+            day["week"] = label
+        return days
+
+    async def run(self, request: str, user_id: str = "pipeline") -> Dict[str, Any]:
+        plan = await self.plan(request, user_id)
+        weeks = plan["plan"]
+
+        if self.agenda_mode == "local":
+            window = get_store().get(user_id, "study_window")
+            return {"type": "pipeline", "plan": plan, "agenda": build_agenda(plan, study_window=window)}
+
+        semaphore = asyncio.Semaphore(self.max_parallel_weeks)
+
+        async def bounded(week):
+            async with semaphore:
+                return await self.week_agenda(plan, week, user_id)
+
+        results = await asyncio.gather(*(bounded(w) for w in weeks), return_exceptions=True)
+
+        days, failed = [], []
+        for week, result in zip(weeks, results):
+            if isinstance(result, Exception):
+                failed.append(week.get("week", "?"))
+            else:
+                days.extend(result)
+
+        notes = "Generated week by week in parallel."
+        if failed:
+            notes += f" Agenda generation failed for: {', '.join(failed)}."
+
+        return {
+            "type": "pipeline",
+            "plan": plan,
+            "agenda": {
+                "period": plan.get("duration") or f"{len(weeks)} weeks",
+                "timezone": "unknown",
+                "days": days,
+                "notes": notes,
+            },
+        }
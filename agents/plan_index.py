@@ -0,0 +1,215 @@
+
+# agents/plan_index.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from agents.json_utils import parse_reply
+from agents.router import json_response, split_route_tag
+from agents.text_index import TfidfIndex
+
+INDEX_PATH = Path("plan_index.db")
+
+# A stored plan is served when its goal text is at least this similar...
+DEFAULT_THRESHOLD = 0.75
+# ...and younger than this.
+DEFAULT_MAX_AGE_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal       TEXT    NOT NULL,
+    weeks      INTEGER NOT NULL,
+    request    TEXT    NOT NULL,
+    plan_json  TEXT    NOT NULL,
+    created_at REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_created ON plans(created_at);
+"""
+
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_COUNT = r"\b(\d+|" + "|".join(NUMBER_WORDS) + r")"
+WEEKS_RE = re.compile(_COUNT + r"[\s-]*weeks?\b")
+MONTHS_RE = re.compile(_COUNT + r"[\s-]*months?\b")
+THIS_WEEK_RE = re.compile(r"\bthis week\b")
+
+
+def _count(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+def duration_weeks(text: str) -> Optional[int]:
+    """"4-week", "two weeks", "1 month", "this week" → number of weeks."""
+    lowered = (text or "").lower()
+    match = WEEKS_RE.search(lowered)
+    if match:
+        return _count(match.group(1))
+    match = MONTHS_RE.search(lowered)
+    if match:
+        return _count(match.group(1)) * 4
+    if THIS_WEEK_RE.search(lowered):
+        return 1
+    return None
+
+
+def topic_text(text: str) -> str:
+    """Request text without route tags and duration phrases, for similarity."""
+    _, body = split_route_tag(text or "")
+    body = body.lower()
+    for pattern in (WEEKS_RE, MONTHS_RE, THIS_WEEK_RE):
+        body = pattern.sub(" ", body)
+    return body
+
+
+def plan_weeks_of(plan: Dict[str, Any]) -> list:
+    return plan.get("weeks") or plan.get("plan") or []
+
+
+class PlanIndex:
+    """
+    Persistent index of validated PlanningAgent outputs.
+
+    Entries are keyed by goal and duration (in weeks); the goal and the
+    original request are searched with TF-IDF. A lookup only considers
+    fresh entries (`max_age_days`) covering at least the requested number
+    of weeks; a longer plan is adapted by keeping its first N weeks.
+    """
+
+    def __init__(self, path=INDEX_PATH, threshold: float = DEFAULT_THRESHOLD,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._index = TfidfIndex()
+        self.hits = 0
+        self.misses = 0
+
+        cutoff = time.time() - self.max_age_seconds
+        self._conn.execute("DELETE FROM plans WHERE created_at < ?", (cutoff,))
+        rows = self._conn.execute("SELECT id, goal, weeks, request, plan_json, created_at FROM plans")
+        for entry_id, goal, weeks, request, plan_json, created_at in rows:
+            self._remember(entry_id, goal, weeks, request, json.loads(plan_json), created_at)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, entry_id, goal, weeks, request, plan, created_at) -> None:
+        self._entries[entry_id] = {"weeks": weeks, "plan": plan, "created_at": created_at}
+        self._index.add(entry_id, f"{goal} {topic_text(request)}")
+
+    def record(self, request: str, plan: Dict[str, Any]) -> bool:
+        """Store a plan if it passes schema validation; returns whether it was stored."""
+        reply = parse_reply(json.dumps(plan))
+        weeks = plan_weeks_of(plan)
+        if reply.kind != "plan" or reply.errors or not weeks:
+            return False
+
+        goal = str(plan.get("goal", ""))
+        created_at = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO plans (goal, weeks, request, plan_json, created_at) VALUES (?, ?, ?, ?, ?)",
+                (goal, len(weeks), request, json.dumps(plan, ensure_ascii=False), created_at),
+            )
+            self._remember(cur.lastrowid, goal, len(weeks), request, plan, created_at)
+        return True
+
+    def lookup(self, request: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(plan, similarity) for a close, fresh match, adapted to the requested duration."""
+        wanted = duration_weeks(request)
+        cutoff = time.time() - self.max_age_seconds
+
+        with self._lock:
+            scope = {
+                k for k, e in self._entries.items()
+                if e["created_at"] >= cutoff and (wanted is None or e["weeks"] >= wanted)
+            }
+            # Same-length plans first, then longer ones that can be cut down
+            best = None
+            for key, score in self._index.search(topic_text(request), top_k=5, keys=scope):
+                if score < self.threshold:
+                    break
+                exact = wanted is None or self._entries[key]["weeks"] == wanted
+                if best is None or (exact and not best[2]):
+                    best = (key, score, exact)
+                if exact:
+                    break
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            plan = json.loads(json.dumps(self._entries[best[0]]["plan"]))
+
+        return adapt(plan, wanted), best[1]
+
+
+def adapt(plan: Dict[str, Any], weeks: Optional[int]) -> Dict[str, Any]:
+    """Trim a stored plan to `weeks` and mark it as reused."""
+    key = "weeks" if "weeks" in plan else "plan"
+    if weeks is not None and len(plan[key]) > weeks:
+        plan[key] = plan[key][:weeks]
+        plan["duration"] = f"{weeks} week" + ("s" if weeks != 1 else "")
+
+    note = "Reused from a similar earlier plan."
+    plan["notes"] = f"{plan.get('notes', '')} {note}".strip()
+    return plan
+
+
+@lru_cache(maxsize=1)
+def get_plan_index() -> PlanIndex:
+    """
+    Process-wide default index: $CONCIERGEX_PLAN_INDEX, else plan_index.db.
+    The variable is read on first use, so a script can set it after import.
+    """
+    return PlanIndex(os.environ.get("CONCIERGEX_PLAN_INDEX", INDEX_PATH))
+
+
+# ---------------------------------------------------------
+# ADK hooks for PlanningAgent
+# ---------------------------------------------------------
+def _request_text(callback_context) -> str:
+    content = getattr(callback_context, "user_content", None)
+    parts = getattr(content, "parts", None) or []
+    return "\n".join(p.text for p in parts if getattr(p, "text", None))
+
+
+def serve_from_index(callback_context, llm_request):
+    """before_model_callback: answer from the index, skipping the model call."""
+    request = _request_text(callback_context)
+    if not request:
+        return None
+
+    match = get_plan_index().lookup(request)
+    if match is None:
+        return None
+    return json_response(match[0])
+
+
+def record_plan(callback_context, llm_response):
+    """after_model_callback: index every valid plan the model produces."""
+    if getattr(llm_response, "partial", False) or llm_response.content is None:
+        return None
+
+    text = "".join(p.text for p in llm_response.content.parts or [] if getattr(p, "text", None))
+    reply = parse_reply(text)
+    request = _request_text(callback_context)
+    if request and reply.ok and isinstance(reply.data, dict):
+        get_plan_index().record(request, reply.data)
+    return None
@@ -1,25 +1,30 @@
 
 # Create PlanningAgent
 # agents/planning_agent.py
-import os
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from agents.models import build_model
+from agents.plan_index import record_plan, serve_from_index
+
+# Also used by the orchestrator's lazy tool before the agent exists
+NAME = "planning_agent"
+DESCRIPTION = "Creates structured multi-week learning plans. Returns JSON only."
 
 
 class PlanningAgent(LlmAgent):
     """
     Produces high-level weekly/monthly plans.
     MUST return JSON only.
+    Close matches among recent validated plans (agents/plan_index.py)
+    are served without a model call; new valid plans are indexed.
     """
 
-    def __init__(self):
+    def __init__(self, tier: str = "cascade"):
         super().__init__(
-            name="planning_agent",
-            description="Creates structured multi-week learning plans. Returns JSON only.",
-            model=Gemini(
-                model_name="gemini-2.5-flash-lite",
-                api_key=os.environ.get("GOOGLE_API_KEY")
-            ),
+            name=NAME,
+            description=DESCRIPTION,
+            model=build_model(tier=tier),
+            before_model_callback=serve_from_index,
+            after_model_callback=record_plan,
             instruction=r"""
 You are PlanningAgent. You create high-level structured learning plans.
 
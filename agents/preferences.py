@@ -0,0 +1,159 @@
+
+# agents/preferences.py
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from agents.json_utils import parse_reply
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path("preferences.db")
+
+# Preference fields the agents understand; anything else is ignored.
+PREFERENCE_KEYS = ("study_window",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id    TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, key)
+);
+"""
+
+
+class PreferenceStore:
+    """
+    Per-user preference memory.
+
+    SQLite is the durable copy; every row is also held in a dict, so
+    reads are O(1) and never touch the disk. Writes go through to both.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        self._cache: Dict[str, Dict[str, str]] = {}
+        for user_id, key, value in self._conn.execute("SELECT user_id, key, value FROM preferences"):
+            self._cache.setdefault(user_id, {})[key] = value
+
+    def get(self, user_id: str, key: Optional[str] = None) -> Any:
+        """All preferences of a user (a copy), or one value when `key` is given."""
+        prefs = self._cache.get(user_id, {})
+        if key is not None:
+            return prefs.get(key)
+        return dict(prefs)
+
+    def set(self, user_id: str, **prefs: str) -> Dict[str, str]:
+        """Store known preference fields; returns what was written."""
+        updates = {k: str(v) for k, v in prefs.items() if k in PREFERENCE_KEYS and v}
+        if not updates:
+            return {}
+
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO preferences (user_id, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    [(user_id, k, v, now) for k, v in updates.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache.setdefault(user_id, {}).update(updates)
+        return updates
+
+    def delete(self, user_id: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM preferences WHERE user_id = ?", (user_id,))
+                self._cache.pop(user_id, None)
+            else:
+                self._conn.execute("DELETE FROM preferences WHERE user_id = ? AND key = ?", (user_id, key))
+                self._cache.get(user_id, {}).pop(key, None)
+
+
+@lru_cache(maxsize=1)
+def get_store() -> PreferenceStore:
+    """Process-wide default store: $CONCIERGEX_PREFERENCES_DB, else preferences.db."""
+    return PreferenceStore(os.environ.get("CONCIERGEX_PREFERENCES_DB", DB_PATH))
+
+
+def normalize_window(window: Any) -> Optional[str]:
+    """
+    A study window in the scheduler's "HH:MM–HH:MM" form ("7pm-9pm" →
+    "19:00–21:00"), or None when it cannot be parsed.
+    """
+    if not window:
+        return None
+    # Local import: agents.router imports this module
+    from agents.router import parse_study_window
+    return parse_study_window(str(window))
+
+
+# ---------------------------------------------------------
+# ADK hooks
+# ---------------------------------------------------------
+def remember(callback_context, memory: Dict[str, Any]) -> None:
+    """
+    Persist a memory update for this user and mirror it into session state.
+    A study window the scheduler could not read is logged and not stored.
+    """
+    memory = dict(memory)
+    if "study_window" in memory:
+        window = normalize_window(memory["study_window"])
+        if window is None:
+            logger.warning("Not storing unparseable study window %r.", memory.pop("study_window"))
+        else:
+            memory["study_window"] = window
+
+    stored = get_store().set(callback_context.user_id, **memory)
+    for key, value in stored.items():
+        callback_context.state[key] = value
+
+
+def record_memory_update(callback_context, llm_response):
+    """
+    after_model_callback for OrchestratorAgent: when the model itself
+    answers with a "memory_update" JSON, persist the preference.
+    """
+    if getattr(llm_response, "partial", False) or llm_response.content is None:
+        return None
+
+    text = "".join(p.text for p in llm_response.content.parts or [] if getattr(p, "text", None))
+    if '"memory_update"' not in text:
+        return None
+
+    reply = parse_reply(text)
+    if reply.kind == "memory_update" and isinstance(reply.data.get("memory"), dict):
+        remember(callback_context, reply.data["memory"])
+    return None
+
+
+def inject_preferences(callback_context, llm_request):
+    """
+    before_model_callback for AgendaAgent: appends only the stored
+    preference fields to the instruction, so no history replay is needed.
+    """
+    window = get_store().get(callback_context.user_id, "study_window")
+    if window:
+        llm_request.append_instructions([
+            f"USER PREFERENCE: the user's study window is {window}. "
+            f"Schedule study blocks inside {window} unless the request says otherwise."
+        ])
+    return None
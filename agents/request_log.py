@@ -0,0 +1,155 @@
+
+# agents/request_log.py
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from agents.json_utils import response_type
+from agents.prompts import detect_route
+
+# Not the repo-root requests.jsonl: traffic logs live under logs/
+LOG_PATH = os.environ.get("CONCIERGEX_REQUEST_LOG", os.path.join("logs", "requests.jsonl"))
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+FLUSH_INTERVAL_SECONDS = 1.0
+BATCH_SIZE = 200
+MAX_QUEUE = 10000
+
+
+class RequestLogger:
+    """
+    Non-blocking JSONL request log.
+
+    `log()` only enqueues; a daemon thread writes records in batches
+    (every `flush_interval` seconds or `batch_size` records) and rotates
+    the file at `max_bytes` (requests.jsonl.1 ... .N). If the queue is
+    full the record is dropped and counted, never blocking a request.
+    """
+
+    def __init__(
+        self,
+        path: str = LOG_PATH,
+        max_bytes: int = MAX_BYTES,
+        backup_count: int = BACKUP_COUNT,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        batch_size: int = BATCH_SIZE,
+        max_queue: int = MAX_QUEUE,
+        thread_name: str = "conciergex-request-log",
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+        self._thread.start()
+
+    def log(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if batch:
+                try:
+                    self._write(batch)
+                except OSError:
+                    self.dropped += len(batch)
+
+    def _rotate(self) -> None:
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.written += len(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the writer thread."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+_default_logger: Optional[RequestLogger] = None
+_default_lock = threading.Lock()
+
+
+def get_request_logger() -> RequestLogger:
+    global _default_logger
+    with _default_lock:
+        if _default_logger is None:
+            _default_logger = RequestLogger()
+            # Flush queued records on interpreter exit (daemon writer thread)
+            atexit.register(_default_logger.close)
+    return _default_logger
+
+
+def log_request(
+    source: str,
+    prompt: str,
+    started: float,
+    output: Optional[str] = None,
+    status: str = "ok",
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    **extra: Any,
+) -> None:
+    """
+    Queue one orchestrator request record. `started` is the time.time()
+    at which the request arrived; replay_requests.py uses it for pacing.
+    """
+    record = {
+        "ts": started,
+        "time": datetime.fromtimestamp(started).isoformat(timespec="milliseconds"),
+        "source": source,
+        "user_id": user_id,
+        "session_id": session_id,
+        "input": prompt,
+        "route": detect_route(prompt),
+        "status": status,
+        "latency_ms": round((time.time() - started) * 1000.0, 1),
+        "output_chars": len(output or ""),
+        "output_type": response_type(output) if output else None,
+        **extra,
+    }
+    get_request_logger().log(record)
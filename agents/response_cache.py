@@ -0,0 +1,224 @@
+
+# agents/response_cache.py
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.genai import types
+
+from agents.deadlines import current_deadline
+from agents.json_utils import parse_reply, regenerate_prompt
+from agents.plan_index import NUMBER_WORDS, duration_weeks
+from agents.preferences import get_store
+from agents.router import split_route_tag
+from agents.sessions import ensure_session
+from agents.text_index import TfidfIndex
+
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+# Session-state keys that change what the orchestrator would answer.
+MEMORY_KEYS = ("study_window",)
+
+# Only expensive, deterministic-enough outputs are worth caching.
+# Memory updates must always reach the runner so session state is written.
+CACHEABLE_TYPES = {"plan", "agenda", "pipeline"}
+
+DEFAULT_USER_ID = "debug_user_id"
+DEFAULT_SESSION_ID = "debug_session_id"
+
+
+# "a" counts as one in durations ("a month") but is not a number on its own
+NUMBER_RE = re.compile(r"\b(\d+|" + "|".join(w for w in NUMBER_WORDS if w != "a") + r")\b")
+
+
+def normalize_prompt(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip(" .!?")
+
+
+def quantities(text: str) -> Tuple:
+    """Duration in weeks plus every number in the prompt; TF-IDF barely sees these."""
+    return (duration_weeks(text), tuple(NUMBER_RE.findall(text)))
+
+
+def cacheable(text: Optional[str]) -> bool:
+    """Schema-valid reply of a cacheable type, from a run where no sub-agent timed out."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.timeouts:
+        return False
+    reply = parse_reply(text)
+    return reply.ok and reply.kind in CACHEABLE_TYPES
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for final orchestrator replies.
+
+    Key: (route tag, normalized prompt, relevant memory state, quantities).
+    With `near_duplicate_threshold` set, a miss falls back to a TF-IDF
+    lookup among entries sharing the same route tag, memory state and
+    quantities (duration and numbers), so a "4-week" plan is never served
+    for an "8-week" request.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        near_duplicate_threshold: Optional[float] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._index = TfidfIndex() if near_duplicate_threshold else None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, memory: Optional[Dict[str, Any]] = None) -> Tuple:
+        tag, body = split_route_tag(prompt)
+        mem = tuple(sorted((k, v) for k, v in (memory or {}).items() if v is not None))
+        body = normalize_prompt(body)
+        return (tag or "", body, mem, quantities(body))
+
+    def _evict(self, key) -> None:
+        self._entries.pop(key, None)
+        if self._index is not None:
+            self._index.remove(key)
+
+    def _lookup(self, key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at < time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def get(self, prompt: str, memory: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        key = self.make_key(prompt, memory)
+        with self._lock:
+            text = self._lookup(key)
+
+            if text is None and self._index is not None:
+                scope = {k for k in self._entries if (k[0], k[2], k[3]) == (key[0], key[2], key[3])}
+                for candidate, score in self._index.search(key[1], top_k=1, keys=scope):
+                    if score >= self.near_duplicate_threshold:
+                        text = self._lookup(candidate)
+
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return text
+
+    def put(self, prompt: str, memory: Optional[Dict[str, Any]], text: str) -> None:
+        key = self.make_key(prompt, memory)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+            self._entries.move_to_end(key)
+            if self._index is not None:
+                self._index.add(key, key[1])
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+
+# ---------------------------------------------------------
+# Runner integration
+# ---------------------------------------------------------
+def final_text(events) -> Optional[str]:
+    """Last non-empty text part in an ADK event list."""
+    for ev in reversed(events):
+        try:
+            for p in getattr(ev.content, "parts", None) or []:
+                if getattr(p, "text", None):
+                    return p.text.strip()
+        except Exception:
+            continue
+    return None
+
+
+async def session_memory(runner, user_id: str, session_id: str) -> Dict[str, Any]:
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    # Persisted preferences apply even before this session has seen them
+    memory = {k: v for k, v in get_store().get(user_id).items() if k in MEMORY_KEYS}
+    if session is not None:
+        memory.update({k: session.state.get(k) for k in MEMORY_KEYS if session.state.get(k) is not None})
+    return memory
+
+
+async def record_cached_turn(runner, user_id: str, session_id: str, prompt: str, text: str) -> None:
+    """
+    Appends a cache hit to the ADK session as a user turn plus the
+    orchestrator's reply, so follow-ups ("now turn that into an agenda")
+    see it in their history as if the model had answered.
+    """
+    session = await ensure_session(runner, user_id, session_id)
+    invocation_id = f"e-cache-{uuid.uuid4().hex}"
+    for author, role, part_text in (("user", "user", prompt), (runner.agent.name, "model", text)):
+        await runner.session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=types.Content(role=role, parts=[types.Part(text=part_text)]),
+        ))
+
+
+async def run_cached(
+    runner,
+    prompt: str,
+    cache: Optional[ResponseCache],
+    user_id: str = DEFAULT_USER_ID,
+    session_id: str = DEFAULT_SESSION_ID,
+    regenerate: bool = False,
+) -> Optional[str]:
+    """
+    Cache-aware replacement for `runner.run_debug(prompt)`.
+    Returns the final reply text (or None if the run produced no text).
+
+    With `regenerate`, a reply that is still malformed after local repair
+    (agents/json_utils.py) gets one follow-up turn asking for corrected JSON.
+    """
+    memory = await session_memory(runner, user_id, session_id) if cache is not None else {}
+
+    if cache is not None:
+        cached = cache.get(prompt, memory)
+        if cached is not None:
+            await record_cached_turn(runner, user_id, session_id, prompt, cached)
+            return cached
+
+    events = await runner.run_debug(prompt, user_id=user_id, session_id=session_id)
+    text = final_text(events)
+
+    if regenerate and text:
+        reply = parse_reply(text)
+        if not reply.ok:
+            events = await runner.run_debug(regenerate_prompt(reply), user_id=user_id, session_id=session_id)
+            retry = final_text(events)
+            if retry and parse_reply(retry).ok:
+                text = retry
+
+    if cache is not None and text and cacheable(text):
+        cache.put(prompt, memory, text)
+
+    return text
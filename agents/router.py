@@ -0,0 +1,288 @@
+
+# agents/router.py
+
+import re
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from agents.preferences import remember
+
+
+# ---------------------------------------------------------
+# Fixed responses (same shapes as OrchestratorAgent types 4–7)
+# ---------------------------------------------------------
+MEDICAL_RESPONSE = {
+    "type": "guardrail",
+    "category": "medical",
+    "status": "blocked",
+    "message": "I cannot provide medical advice. Please consult a qualified doctor or seek emergency medical care if you have heart pain.",
+}
+
+ILLEGAL_RESPONSE = {
+    "type": "guardrail",
+    "category": "illegal",
+    "status": "blocked",
+    "message": "I cannot assist with illegal or unethical activities such as hacking.",
+}
+
+CLARIFICATION_RESPONSE = {
+    "type": "clarification",
+    "status": "needs_clarification",
+    "missing": ["topic", "duration"],
+    "message": "Please clarify what you want to study and for how long (e.g. 1 week, 4 weeks) so I can create a detailed agenda.",
+}
+
+
+# ---------------------------------------------------------
+# Small local classifier: weighted keyword stems per route.
+# Negative weights pull learning requests ("study heart disease") back.
+# ---------------------------------------------------------
+ROUTE_FEATURES = {
+    "medical": {
+        r"\bhow (do|can|should) i\b": 1.0,
+        r"\btreat": 1.5,
+        r"\bpain\b": 2.0,
+        r"\bsymptom": 2.0,
+        r"\bdisease": 2.0,
+        r"\billness": 2.0,
+        r"\bheart\b": 1.0,
+        r"\bdiagnos": 2.0,
+        r"\bmedic(ine|ation)": 2.0,
+        r"\bdos(e|age)\b": 1.5,
+        r"\bfever\b": 2.0,
+        r"\binjur": 1.5,
+        r"\bcure\b": 1.5,
+    },
+    "illegal": {
+        r"\bhow (do|can|should) i\b": 1.0,
+        r"\bhack(ing|er|ers|ed)?\b": 2.5,
+        r"\bbreak(ing)? into\b": 2.5,
+        r"\bsteal": 2.5,
+        r"\bmalware\b": 2.5,
+        r"\bransomware\b": 2.5,
+        r"\bphish": 2.5,
+        r"\bcrack(ing)?\b": 1.5,
+        r"\bbypass": 1.0,
+        r"\bpassword": 1.0,
+        r"\bserver": 0.5,
+    },
+}
+
+# ML / data vocabulary outweighs the medical stems ("symptoms of
+# overfitting", "treat missing data in my disease prediction model").
+ML_FEATURES = {
+    r"\b(model|models|dataset|data)\b": -2.5,
+    r"\b(overfit|underfit)\w*": -2.5,
+    r"\b(training|prediction|classifier|neural|regression|machine learning)\b": -2.0,
+}
+
+# The medical route needs real health context; "symptom", "diagnose",
+# "treat" and "disease" alone are common in technical questions.
+HEALTH_CONTEXT_RE = re.compile(
+    r"\b(pain|ache|aches|fever|heart|chest|injur\w*|medic(ine|ines|ation|ations)|dos(e|age)|doctor|"
+    r"illness|sick|bleeding|rash|vomit\w*|headache|pregnan\w*|my (disease|symptoms?|condition))\b"
+)
+
+LEARNING_FEATURES = {
+    r"\blearn": -2.0,
+    r"\bstudy": -2.0,
+    r"\bcourse": -2.0,
+    r"\bplan\b": -1.5,
+    r"\bagenda\b": -1.5,
+    r"\bschedule\b": -1.5,
+}
+
+CONFIDENCE_THRESHOLD = 3.0
+CONFIDENCE_MARGIN = 1.5
+
+ROUTE_TAG_RE = re.compile(r"^\s*\[(force_\w+)\]\s*")
+DURATION_RE = re.compile(
+    r"\b(\d+|one|two|three|four|five|six)[\s-]*(day|week|month)s?\b|\bthis (week|month)\b|\btoday\b|\btomorrow\b"
+)
+TIME_RANGE_RE = re.compile(
+    r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|–|to|until|till)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?"
+)
+AGENDA_RE = re.compile(r"\b(agenda|schedule)\b")
+# A "remember ..." time range is only a study window when it is about study time
+STUDY_CONTEXT_RE = re.compile(r"\b(stud(y|ying|ies)|learn\w*|revis\w*|practi[cs]e|after work|evening)\b")
+
+CLARIFICATION_STOPWORDS = {
+    "make", "me", "an", "a", "the", "my", "for", "to", "of", "please", "can", "you",
+    "create", "give", "build", "generate", "i", "want", "need", "some", "new",
+    "agenda", "schedule", "daily", "day-by-day", "study", "studying", "learning",
+}
+
+
+def split_route_tag(text: str) -> Tuple[Optional[str], str]:
+    """Splits a leading "[force_xxx]" tag from the message body."""
+    m = ROUTE_TAG_RE.match(text)
+    if not m:
+        return None, text
+    return m.group(1), text[m.end():]
+
+
+def classify(text: str) -> Tuple[Optional[str], float]:
+    """
+    Scores the hard-guardrail routes.
+    Returns (route, score) when one route is confidently ahead, else (None, best_score).
+    """
+    lowered = text.lower()
+    learning = sum(w for pattern, w in LEARNING_FEATURES.items() if re.search(pattern, lowered))
+
+    scores = {}
+    for route, features in ROUTE_FEATURES.items():
+        scores[route] = learning + sum(w for pattern, w in features.items() if re.search(pattern, lowered))
+
+    if HEALTH_CONTEXT_RE.search(lowered):
+        scores["medical"] += sum(w for pattern, w in ML_FEATURES.items() if re.search(pattern, lowered))
+    else:
+        scores["medical"] = 0.0
+
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+
+    if best_score >= CONFIDENCE_THRESHOLD and best_score - runner_up >= CONFIDENCE_MARGIN:
+        return best, best_score
+    return None, best_score
+
+
+def _to_24h(hour: int, minute: int, meridiem: Optional[str], assume_pm: bool) -> Optional[str]:
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    elif meridiem is None and assume_pm and hour < 12:
+        hour += 12
+
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def parse_study_window(text: str, strict: bool = False) -> Optional[str]:
+    """
+    Parses "7pm to 9pm" / "19:00-21:00" into "19:00–21:00".
+    With `strict`, bare ambiguous hours ("7-9") give None instead of a guess.
+    """
+    m = TIME_RANGE_RE.search(text.lower())
+    if not m:
+        return None
+
+    h1, m1, ap1, h2, m2, ap2 = m.groups()
+    # "7 to 9pm" → both pm; bare hours after work are evening hours.
+    ap1 = ap1 or ap2
+    assume_pm = "after work" in text.lower() or "evening" in text.lower()
+    # 24-hour times ("19:00", "07:30") are explicit too
+    explicit_24h = any(h and (int(h) > 12 or (mm and h.startswith("0"))) for h, mm in ((h1, m1), (h2, m2)))
+    if strict and not (ap1 or assume_pm or explicit_24h):
+        return None
+
+    start = _to_24h(int(h1), int(m1 or 0), ap1, assume_pm)
+    end = _to_24h(int(h2), int(m2 or 0), ap2, assume_pm)
+    if not start or not end or start >= end:
+        return None
+    return f"{start}–{end}"
+
+
+def memory_update_response(window: str, after_work: bool = True) -> Dict[str, Any]:
+    suffix = " after work" if after_work else ""
+    return {
+        "type": "memory_update",
+        "status": "stored",
+        "stored": True,
+        "memory": {"study_window": window},
+        "message": f"Got it. I will use {window} as your default study window{suffix}.",
+    }
+
+
+def _needs_clarification(body: str) -> bool:
+    lowered = body.lower()
+    if not AGENDA_RE.search(lowered) or "again" in lowered or DURATION_RE.search(lowered):
+        return False
+
+    words = re.findall(r"[a-z][a-z\-]*", lowered)
+    return all(w in CLARIFICATION_STOPWORDS for w in words)
+
+
+def route(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Deterministic fast path.
+    Returns the final orchestrator JSON for guardrail, clarification and
+    memory-update requests, or None when the model should decide.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+
+    tag, body = split_route_tag(text)
+
+    category, _ = classify(body)
+    if category == "medical":
+        return dict(MEDICAL_RESPONSE)
+    if category == "illegal":
+        return dict(ILLEGAL_RESPONSE)
+
+    # Forced routes and JSON payloads always go to their specialist.
+    if tag or body.lstrip().startswith(("{", "[")):
+        return None
+
+    lowered = body.lower()
+    if re.search(r"\bremember\b", lowered):
+        # Meetings and ambiguous hours go to the model, not into stored preferences
+        window = parse_study_window(body, strict=True) if STUDY_CONTEXT_RE.search(lowered) else None
+        if window:
+            return memory_update_response(window, after_work="after work" in lowered)
+        return None
+
+    if _needs_clarification(body):
+        return dict(CLARIFICATION_RESPONSE, missing=list(CLARIFICATION_RESPONSE["missing"]))
+
+    return None
+
+
+# ---------------------------------------------------------
+# ADK hook
+# ---------------------------------------------------------
+def latest_user_text(llm_request) -> Optional[str]:
+    """Text of the newest user turn, or None if the last content is a tool result."""
+    if not llm_request.contents:
+        return None
+
+    last = llm_request.contents[-1]
+    if last.role != "user" or not last.parts:
+        return None
+    if any(getattr(p, "function_response", None) for p in last.parts):
+        return None
+
+    texts = [p.text for p in last.parts if getattr(p, "text", None)]
+    return "\n".join(texts) if texts else None
+
+
+def json_response(payload: Dict[str, Any]) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(text=json.dumps(payload, ensure_ascii=False))],
+        )
+    )
+
+
+def fast_path_callback(callback_context, llm_request) -> Optional[LlmResponse]:
+    """
+    before_model_callback for OrchestratorAgent.
+    Returning an LlmResponse skips the Gemini call for this turn.
+    """
+    text = latest_user_text(llm_request)
+    if text is None:
+        return None
+
+    payload = route(text)
+    if payload is None:
+        return None
+
+    if payload["type"] == "memory_update":
+        remember(callback_context, payload["memory"])
+
+    return json_response(payload)
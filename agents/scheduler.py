@@ -0,0 +1,176 @@
+
+# agents/scheduler.py
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from agents.json_utils import parse_object
+from agents.preferences import get_store, normalize_window
+
+logger = logging.getLogger(__name__)
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+WEEKEND = ("Saturday", "Sunday")
+
+# Same defaults as AgendaAgent's instruction
+WEEKDAY_WINDOW = "18:00–20:00"
+WEEKEND_WINDOW = "10:00–12:00"
+DEFAULT_MAX_BLOCKS_PER_DAY = 2
+CATEGORIES = ("study", "practice", "review", "project")
+
+# First match wins; anything else is "study".
+CATEGORY_KEYWORDS = (
+    ("review", r"\b(review|recap|revise|revision|reflect|quiz|summar\w*)\b"),
+    ("project", r"\b(project|build|deploy|capstone|ship|portfolio|app)\b"),
+    ("practice", r"\b(practi[cs]e|exercise|lab|hands[- ]on|implement|code|coding|notebook|experiment|tutorial)\b"),
+)
+
+
+def parse_window(window: str) -> Tuple[int, int]:
+    """"19:00–21:00" (en dash or hyphen) → (start, end) in minutes."""
+    match = re.match(r"\s*(\d{1,2}):(\d{2})\s*[–\-]\s*(\d{1,2}):(\d{2})\s*$", window or "")
+    if not match:
+        raise ValueError(f"Invalid time window: {window!r}")
+    h1, m1, h2, m2 = (int(g) for g in match.groups())
+    start, end = h1 * 60 + m1, h2 * 60 + m2
+    if end <= start:
+        raise ValueError(f"Time window ends before it starts: {window!r}")
+    return start, end
+
+
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def split_window(window: str, count: int) -> List[str]:
+    """Split a window into `count` equal back-to-back blocks."""
+    start, end = parse_window(window)
+    step = (end - start) // max(count, 1)
+    return [f"{_hhmm(start + i * step)}–{_hhmm(start + (i + 1) * step)}" for i in range(count)]
+
+
+def categorize(activity: str, categories: Sequence[str] = CATEGORIES) -> str:
+    lowered = activity.lower()
+    for category, pattern in CATEGORY_KEYWORDS:
+        if category in categories and re.search(pattern, lowered):
+            return category
+    return "study" if "study" in categories else categories[0]
+
+
+def _spread(tasks: List[str], max_blocks_per_day: int) -> List[List[str]]:
+    """Tasks → 7 day buckets, as even as possible, keeping order."""
+    buckets: List[List[str]] = [[] for _ in DAYS]
+    capacity = len(DAYS) * max_blocks_per_day
+    for i, task in enumerate(tasks[:capacity]):
+        buckets[i * len(DAYS) // min(len(tasks), capacity)].append(task)
+
+    # Overflow goes into Sunday's last block rather than being dropped
+    overflow = tasks[capacity:]
+    if overflow:
+        buckets[-1][-1] = "; ".join([buckets[-1][-1], *overflow])
+    return buckets
+
+
+def _filler(day: str, week: str, focus: str) -> str:
+    if day == "Sunday":
+        return f"Review {week}: {focus}" if focus else f"Review {week}"
+    if day == "Saturday":
+        return f"Mini project applying {focus}" if focus else "Mini project"
+    return f"Practice exercises on {focus}" if focus else "Practice exercises"
+
+
+def plan_weeks(plan: Any) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Accepts PlanningAgent output, an orchestrator "plan"/"pipeline" reply, or their JSON text."""
+    data = parse_object(plan) if isinstance(plan, str) else plan
+    if not isinstance(data, dict):
+        raise ValueError("Plan must be a JSON object.")
+    if isinstance(data.get("plan"), dict):
+        data = data["plan"]
+
+    weeks = data.get("weeks") or data.get("plan")
+    if not isinstance(weeks, list) or not weeks:
+        raise ValueError("Plan has no weeks to schedule.")
+    return data, [w for w in weeks if isinstance(w, dict)]
+
+
+def build_agenda(
+    plan: Any,
+    study_window: Optional[str] = None,
+    max_blocks_per_day: int = DEFAULT_MAX_BLOCKS_PER_DAY,
+    categories: Sequence[str] = CATEGORIES,
+    weekend_window: str = WEEKEND_WINDOW,
+    timezone: str = "unknown",
+) -> Dict[str, Any]:
+    """
+    Agenda JSON (AgendaAgent schema) for a weekly plan, computed locally.
+
+    Each week's tasks are spread Monday→Sunday in order, at most
+    `max_blocks_per_day` blocks a day, inside the study window on
+    weekdays (default 18:00–20:00) and `weekend_window` on weekends.
+    Days without a task get a practice / mini-project / review block.
+    A study window that cannot be parsed is logged and the default used.
+    """
+    data, weeks = plan_weeks(plan)
+    if study_window:
+        window = normalize_window(study_window)
+        if window is None:
+            logger.warning("Invalid study window %r; using the default %s.", study_window, WEEKDAY_WINDOW)
+        study_window = window
+    weekday_window = study_window or WEEKDAY_WINDOW
+    max_blocks_per_day = max(1, max_blocks_per_day)
+
+    days = []
+    for index, week in enumerate(weeks, start=1):
+        label = week.get("week") or f"Week {index}"
+        focus = week.get("focus", "")
+        tasks = [str(t) for t in week.get("tasks") or [] if str(t).strip()]
+
+        buckets = _spread(tasks, max_blocks_per_day) if tasks else [[] for _ in DAYS]
+        for day, activities in zip(DAYS, buckets):
+            activities = activities or [_filler(day, label, focus)]
+            window = weekend_window if day in WEEKEND else weekday_window
+            days.append({
+                "week": label,
+                "day": day,
+                "focus": focus,
+                "blocks": [
+                    {"time": time, "activity": activity, "category": categorize(activity, categories)}
+                    for time, activity in zip(split_window(window, len(activities)), activities)
+                ],
+            })
+
+    window_note = f"your study window {study_window}" if study_window else f"default weekday {WEEKDAY_WINDOW}"
+    return {
+        "period": data.get("duration") or f"{len(weeks)} weeks",
+        "timezone": timezone,
+        "days": days,
+        "notes": f"Scheduled locally: {window_note} on weekdays, {weekend_window} on weekends, "
+                 f"up to {max_blocks_per_day} blocks per day.",
+    }
+
+
+# ---------------------------------------------------------
+# Orchestrator tool
+# ---------------------------------------------------------
+def schedule_agenda(plan_json: str, max_blocks_per_day: int = DEFAULT_MAX_BLOCKS_PER_DAY, tool_context=None) -> Dict[str, Any]:
+    """
+    Turns weekly plan JSON (planning_agent output) into a day-by-day agenda
+    instantly, without a model call. Uses the user's stored study window.
+
+    Args:
+        plan_json: The plan JSON with "goal", "duration" and "weeks" (or "plan").
+        max_blocks_per_day: Maximum number of study blocks per day.
+
+    Returns:
+        Agenda JSON with "period", "timezone", "days" and "notes",
+        or {"status": "error", "message": ...} if the plan is unusable.
+    """
+    window = None
+    if tool_context is not None:
+        window = tool_context.state.get("study_window") or get_store().get(tool_context.user_id, "study_window")
+
+    try:
+        return build_agenda(plan_json, study_window=window, max_blocks_per_day=max_blocks_per_day)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
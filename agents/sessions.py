@@ -0,0 +1,55 @@
+
+# agents/sessions.py
+
+import asyncio
+from collections import OrderedDict
+from typing import Tuple
+
+DEFAULT_MAX_SESSIONS = 1000
+
+
+async def ensure_session(runner, user_id: str, session_id: str):
+    """Returns the runner session, creating it on first use (as run_debug does)."""
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    if session is None:
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_id
+        )
+    return session
+
+
+class SessionPool:
+    """
+    Per-client sessions on top of one runner's session service.
+
+    Every (user_id, session_id) pair gets its own ADK session, so clients
+    no longer share a single history. The least recently used sessions are
+    deleted once `max_sessions` is exceeded, bounding server memory.
+    """
+
+    def __init__(self, runner, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.runner = runner
+        self.max_sessions = max_sessions
+        self._recent: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._recent)
+
+    async def acquire(self, user_id: str, session_id: str):
+        session = await ensure_session(self.runner, user_id, session_id)
+
+        async with self._lock:
+            key = (user_id, session_id)
+            self._recent[key] = None
+            self._recent.move_to_end(key)
+
+            while len(self._recent) > self.max_sessions:
+                (old_user, old_session), _ = self._recent.popitem(last=False)
+                await self.runner.session_service.delete_session(
+                    app_name=self.runner.app_name, user_id=old_user, session_id=old_session
+                )
+
+        return session
@@ -0,0 +1,60 @@
+
+# agents/startup.py
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class StartupReport:
+    """
+    Wall-clock timings of start-up phases (agent construction, runner,
+    caches), plus the sub-agents and model clients built later, on
+    first use. Printed by the A2A server and exposed in /health.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        self.lazy: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round((time.perf_counter() - t0) * 1000.0, 1)
+
+    def mark(self, name: str) -> None:
+        """Record `name` as the time since this report was created (e.g. "imports")."""
+        with self._lock:
+            self.phases[name] = round((time.perf_counter() - self.started) * 1000.0, 1)
+
+    def record_lazy(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.lazy[name] = round(elapsed_ms, 1)
+
+    def mark_ready(self) -> None:
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000.0, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ready_ms": self.ready_ms, "phases": dict(self.phases), "lazy": dict(self.lazy)}
+
+    def format(self) -> str:
+        lines = [f"⏱️ Start-up: ready in {self.ready_ms or 0:.0f} ms"]
+        with self._lock:
+            for name, ms in self.phases.items():
+                lines.append(f"   {name:<24} {ms:8.1f} ms")
+            for name, ms in self.lazy.items():
+                lines.append(f"   {name + ' (lazy)':<24} {ms:8.1f} ms")
+        return "\n".join(lines)
+
+
+# Created on first import of this module, i.e. early in the process.
+startup = StartupReport()
@@ -0,0 +1,96 @@
+
+# agents/streaming.py
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.genai import types
+
+from agents.sessions import ensure_session
+from agents.response_cache import (
+    DEFAULT_SESSION_ID,
+    DEFAULT_USER_ID,
+    ResponseCache,
+    cacheable,
+    record_cached_turn,
+    session_memory,
+)
+
+
+async def pump(events: AsyncIterator[Dict[str, Any]], queue: asyncio.Queue) -> None:
+    """
+    Drains `events` into `queue`, then puts None (or the exception raised).
+
+    Run it as one task: the whole generator then executes in a single
+    context, so context variables set between steps (tracing spans, the
+    request deadline) survive, unlike stepping it with wait_for, which
+    runs every step in a fresh task.
+    """
+    try:
+        async for item in events:
+            await queue.put(item)
+        await queue.put(None)
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        await events.aclose()
+
+
+def sse_format(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_run(
+    runner,
+    prompt: str,
+    cache: Optional[ResponseCache] = None,
+    user_id: str = DEFAULT_USER_ID,
+    session_id: str = DEFAULT_SESSION_ID,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the orchestrator and yields events as the ADK runner produces them:
+
+        {"event": "tool_call",   "data": {"author", "name", "args"}}
+        {"event": "tool_result", "data": {"author", "name"}}
+        {"event": "partial",     "data": {"author", "text"}}
+        {"event": "final",       "data": {"output", "cached"}}
+    """
+    memory = await session_memory(runner, user_id, session_id) if cache is not None else {}
+
+    if cache is not None:
+        cached = cache.get(prompt, memory)
+        if cached is not None:
+            await record_cached_turn(runner, user_id, session_id, prompt, cached)
+            yield {"event": "final", "data": {"output": cached, "cached": True}}
+            return
+
+    await ensure_session(runner, user_id, session_id)
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    final = None
+    async for ev in runner.run_async(
+        user_id=user_id, session_id=session_id, new_message=message, run_config=run_config
+    ):
+        for call in ev.get_function_calls():
+            yield {"event": "tool_call", "data": {"author": ev.author, "name": call.name, "args": call.args or {}}}
+
+        for result in ev.get_function_responses():
+            yield {"event": "tool_result", "data": {"author": ev.author, "name": result.name}}
+
+        parts = getattr(ev.content, "parts", None) or []
+        text = "".join(p.text for p in parts if getattr(p, "text", None))
+        if not text:
+            continue
+
+        if ev.partial:
+            yield {"event": "partial", "data": {"author": ev.author, "text": text}}
+        elif ev.is_final_response():
+            final = text.strip()
+
+    if cache is not None and final and cacheable(final):
+        cache.put(prompt, memory, final)
+
+    yield {"event": "final", "data": {"output": final, "cached": False}}
@@ -3,62 +3,99 @@
 # agents/task_manager.py
 # agents/task_manager.py
 
-import os, json
+import asyncio
+
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.tools import FunctionTool
 
-TASKS_FILE = "tasks.json"
+from typing import List
+
+from agents.models import build_model
+from tools.task_store import compact, get_store
+
+
+# Tool results land in the LLM context, so every function returns the
+# compact {id, title, done} shape and never echoes the full list.
+# Store calls are blocking SQLite (and may wait on the write lock), so
+# they run in a worker thread instead of on the event loop.
+
+async def add_task(title: str, details: str = ""):
+    """Add a new task to the task list."""
+    task = await asyncio.to_thread(get_store().add, title, details)
+    return {"status": "ok", "added": compact(task)}
+
+
+async def add_tasks(titles: List[str]):
+    """Add several tasks in one call."""
+    tasks = await asyncio.to_thread(get_store().add_many, titles)
+    return {"status": "ok", "added": [compact(t) for t in tasks]}
+
 
+async def list_tasks(
+    status: str = "all",
+    text: str = "",
+    since: str = "",
+    until: str = "",
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Return one page of tasks.
+    status: all | done | pending; text: substring match;
+    since/until: ISO dates; limit/offset: pagination.
+    """
+    tasks, total = await asyncio.to_thread(get_store().query, status, text, since, until, limit, offset)
+    next_offset = offset + len(tasks)
+    return {
+        "status": "ok",
+        "total": total,
+        "count": len(tasks),
+        "next_offset": next_offset if next_offset < total else None,
+        "tasks": [compact(t) for t in tasks],
+    }
 
-def load_tasks():
-    if not os.path.exists(TASKS_FILE):
-        return []
-    try:
-        with open(TASKS_FILE, "r") as f:
-            return json.load(f)
-    except:
-        return []
 
+async def complete_task(task_id: int, done: bool = True):
+    """Mark a task as done (or pending again) by id."""
+    task = await asyncio.to_thread(get_store().set_done, task_id, done)
+    if task is None:
+        return {"status": "error", "message": f"task {task_id} not found"}
+    return {"status": "ok", "task": compact(task)}
 
-def save_tasks(tasks):
-    with open(TASKS_FILE, "w") as f:
-        json.dump(tasks, f, indent=2)
+
+async def complete_tasks(task_ids: List[int], done: bool = True):
+    """Mark several tasks as done (or pending) by id."""
+    updated = await asyncio.to_thread(get_store().set_done_many, task_ids, done)
+    missing = sorted(set(task_ids) - set(updated))
+    return {"status": "ok", "updated": updated, "missing": missing}
+
+
+async def delete_task(task_id: int):
+    """Delete a task by id."""
+    removed = await asyncio.to_thread(get_store().delete, task_id)
+    if removed is None:
+        return {"status": "error", "message": f"task {task_id} not found"}
+    return {"status": "ok", "removed": compact(removed)}
+
+
+async def delete_tasks(task_ids: List[int]):
+    """Delete several tasks by id."""
+    deleted = await asyncio.to_thread(get_store().delete_many, task_ids)
+    missing = sorted(set(task_ids) - set(deleted))
+    return {"status": "ok", "deleted": deleted, "missing": missing}
+
+
+# The task operations need no model: TaskTool calls them directly and
+# TaskManagerAgent exposes them to its LLM as function tools.
+TASK_ACTIONS = (add_task, add_tasks, list_tasks, complete_task, complete_tasks, delete_task, delete_tasks)
 
 
 class TaskManagerAgent(LlmAgent):
 
-    def __init__(self):
+    def __init__(self, tier: str = "fast"):
         super().__init__(
             name="task_manager",
             description="Manages to-do tasks. Returns JSON only.",
-            model=Gemini(
-                model_name="gemini-2.5-flash-lite",
-                api_key=os.environ.get("GOOGLE_API_KEY"),
-            ),
-            tools=[
-                FunctionTool(self.add_task),
-                FunctionTool(self.list_tasks),
-                FunctionTool(self.delete_task),
-            ]
+            model=build_model(tier=tier),
+            tools=[FunctionTool(action) for action in TASK_ACTIONS],
         )
-
-    async def add_task(self, title: str, details: str = ""):
-        """Add a new task to the task list."""
-        tasks = load_tasks()
-        tasks.append({"title": title, "details": details})
-        save_tasks(tasks)
-        return {"status": "ok", "tasks": tasks}
-
-    async def list_tasks(self):
-        """Return all tasks."""
-        return {"status": "ok", "tasks": load_tasks()}
-
-    async def delete_task(self, index: int):
-        """Delete a task by index."""
-        tasks = load_tasks()
-        if 0 <= index < len(tasks):
-            removed = tasks.pop(index)
-            save_tasks(tasks)
-            return {"status": "ok", "removed": removed, "tasks": tasks}
-        return {"status": "error", "message": "index out of range"}
@@ -4,48 +4,110 @@
 # agents/task_tools.py
 # agents/task_tools.py
 
-import json
-import os
+from typing import Any, Dict, List, Optional
+
 from google.adk.tools import AgentTool
-from agents.task_manager import TaskManagerAgent
+from google.genai import types
+from agents import task_manager
 
 
 class TaskTool(AgentTool):
     """
     ADK-Compatible Task Tool
 
-    - Wraps TaskManagerAgent backend
+    - Calls the task operations of agents/task_manager.py directly
     - Implements a single tool interface for orchestrator
-    - Exposes: action = ["add", "list", "delete"]
+    - Exposes: action = ["add", "list", "complete", "delete",
+                         "bulk_add", "bulk_complete", "bulk_delete"]
+    - "list" is filtered and paginated (status, text, since, until,
+      limit, offset); results use the compact {id, title, done} shape.
+    - Tasks live in the shared SQLite store (tools/task_store.py) and are
+      addressed by their stable id.
+    - No TaskManagerAgent (and so no model client) is ever built for it.
     """
 
     def __init__(self):
         # Required attributes BEFORE calling super()
         self.name = "task_manager"
-        self.description = "Manage user tasks (add, list, delete)."
-
-        # Backend task manager
-        self.manager = TaskManagerAgent()
+        self.description = (
+            "Manage user tasks: add, list (filter by status/text/date, paginate "
+            "with limit/offset), complete, delete, and bulk_add/bulk_complete/bulk_delete."
+        )
 
         # Initialize as a tool
         super().__init__(agent=self)
 
-    async def run(self, action: str, title: str = "", task_id: int = 0):
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        string = types.Schema(type=types.Type.STRING)
+        integer = types.Schema(type=types.Type.INTEGER)
+
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    "action": types.Schema(
+                        type=types.Type.STRING,
+                        enum=["add", "list", "complete", "delete",
+                              "bulk_add", "bulk_complete", "bulk_delete"],
+                    ),
+                    "title": string,
+                    "task_id": integer,
+                    "titles": types.Schema(type=types.Type.ARRAY, items=string),
+                    "task_ids": types.Schema(type=types.Type.ARRAY, items=integer),
+                    "status": types.Schema(type=types.Type.STRING, enum=["all", "done", "pending"]),
+                    "text": string,
+                    "since": string,
+                    "until": string,
+                    "limit": integer,
+                    "offset": integer,
+                },
+                required=["action"],
+            ),
+        )
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context) -> Any:
+        return await self.run(**args)
+
+    async def run(
+        self,
+        action: str,
+        title: str = "",
+        task_id: int = 0,
+        titles: Optional[List[str]] = None,
+        task_ids: Optional[List[int]] = None,
+        status: str = "all",
+        text: str = "",
+        since: str = "",
+        until: str = "",
+        limit: int = 20,
+        offset: int = 0,
+    ):
         """
         Executes task operations based on the tool call.
-        Always returns JSON-serializable dict.
+        Always returns a small JSON-serializable dict.
         """
 
         if action == "list":
-            tasks = await self.manager.list_tasks()
-            return {"status": "ok", "tasks": tasks}
+            return await task_manager.list_tasks(status, text, since, until, limit, offset)
 
         if action == "add":
-            result = await self.manager.add_task(title)
-            return {"status": "ok", "added": result}
+            return await task_manager.add_task(title)
+
+        if action == "complete":
+            return await task_manager.complete_task(task_id)
 
         if action == "delete":
-            result = await self.manager.delete_task(task_id)
-            return {"status": "ok", "deleted": result}
+            return await task_manager.delete_task(task_id)
+
+        if action == "bulk_add":
+            return await task_manager.add_tasks(titles or [])
+
+        if action == "bulk_complete":
+            return await task_manager.complete_tasks(task_ids or [])
+
+        if action == "bulk_delete":
+            return await task_manager.delete_tasks(task_ids or [])
 
         return {"status": "error", "message": f"Unknown action '{action}'"}
@@ -0,0 +1,78 @@
+
+# agents/text_index.py
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class TfidfIndex:
+    """
+    Minimal in-process TF-IDF index with cosine similarity search.
+
+    Documents are short prompts/goals, so a linear scan over the
+    stored term vectors is cheaper than pulling in a vector library.
+    """
+
+    def __init__(self):
+        self._docs: Dict[Hashable, Counter] = {}
+        self._df: Counter = Counter()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key: Hashable, text: str) -> None:
+        if key in self._docs:
+            self.remove(key)
+        terms = Counter(tokenize(text))
+        self._docs[key] = terms
+        self._df.update(terms.keys())
+
+    def remove(self, key: Hashable) -> None:
+        terms = self._docs.pop(key, None)
+        if terms is None:
+            return
+        self._df.subtract(terms.keys())
+        self._df += Counter()  # drop zero counts
+
+    def _vector(self, terms: Counter) -> Dict[str, float]:
+        n = len(self._docs)
+        return {
+            t: tf * (math.log((n + 1) / (self._df.get(t, 0) + 1)) + 1.0)
+            for t, tf in terms.items()
+        }
+
+    @staticmethod
+    def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+        dot = sum(w * b.get(t, 0.0) for t, w in a.items())
+        if not dot:
+            return 0.0
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
+
+    def search(self, text: str, top_k: int = 5, keys: Optional[set] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Returns up to top_k (key, similarity) pairs, best first.
+        If `keys` is given, only those documents are considered.
+        """
+        query = self._vector(Counter(tokenize(text)))
+        if not query:
+            return []
+
+        scored = []
+        for key, terms in self._docs.items():
+            if keys is not None and key not in keys:
+                continue
+            score = self._cosine(query, self._vector(terms))
+            if score > 0:
+                scored.append((key, score))
+
+        scored.sort(key=lambda kv: kv[1], reverse=True)
+        return scored[:top_k]
@@ -0,0 +1,267 @@
+
+# agents/tracing.py
+
+import os
+import json
+import atexit
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from agents.prompts import estimate_tokens
+from agents.request_log import RequestLogger
+from agents.stats import percentile
+
+TRACE_PATH = os.environ.get("CONCIERGEX_TRACE_PATH", os.path.join("logs", "traces.jsonl"))
+
+# Current span / trace for the running task. asyncio tasks copy the
+# context when created, so sub-agents and parallel tools inherit the parent.
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("conciergex_span", default=None)
+_current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("conciergex_trace", default=None)
+
+
+@contextmanager
+def trace_scope(trace_id: Optional[str] = None):
+    """
+    Records every span started inside the block under one trace id (a
+    new one by default), including spans from AgentTool child runners,
+    which inherit the context. Yields the id, for `Tracer.spans`.
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    token = _current_trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(token)
+
+
+def summarize(spans: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per (kind, name) aggregates: count, latency avg/p95, token totals, errors."""
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        groups[(span["kind"], span["name"])].append(span)
+
+    rows = []
+    for (kind, name), items in sorted(groups.items()):
+        durations = [s["duration_ms"] for s in items]
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "count": len(items),
+            "avg_ms": sum(durations) / len(durations),
+            "p95_ms": percentile(durations, 95),
+            "total_ms": sum(durations),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in items),
+            "output_tokens": sum(s.get("output_tokens", 0) for s in items),
+            "errors": sum(1 for s in items if s.get("status") == "error"),
+        })
+    return rows
+
+
+def load_spans(path: str = TRACE_PATH, limit: int = 5000) -> List[Dict[str, Any]]:
+    """Last `limit` spans from the JSONL export."""
+    if not os.path.exists(path):
+        return []
+    spans: deque = deque(maxlen=limit)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except Exception:
+                continue
+    return list(spans)
+
+
+class Tracer:
+    """
+    Span store: keeps recent finished spans in memory and queues each
+    one for the JSONL file. Spans carry trace_id / span_id / parent_id.
+
+    The file is written by a RequestLogger (agents/request_log.py), i.e.
+    in batches on a daemon thread with rotation, so ending a span never
+    does disk I/O on the event loop.
+    """
+
+    def __init__(self, path: Optional[str] = TRACE_PATH, keep: int = 2000):
+        self.path = path
+        self.recent: deque = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._writer = RequestLogger(path, thread_name="conciergex-traces") if path else None
+
+    def start(self, kind: str, name: str, **attrs) -> Dict[str, Any]:
+        trace_id = _current_trace.get()
+        if trace_id is None:
+            trace_id = uuid.uuid4().hex
+            _current_trace.set(trace_id)
+
+        span = {
+            "trace_id": trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": _current_span.get(),
+            "kind": kind,
+            "name": name,
+            "start": time.time(),
+            "_t0": time.perf_counter(),
+            **attrs,
+        }
+        _current_span.set(span["span_id"])
+        return span
+
+    def end(self, span: Dict[str, Any], status: str = "ok", **attrs) -> Dict[str, Any]:
+        span["duration_ms"] = (time.perf_counter() - span.pop("_t0")) * 1000.0
+        span["status"] = status
+        span.update(attrs)
+        _current_span.set(span["parent_id"])
+        if span["parent_id"] is None:
+            _current_trace.set(None)
+
+        with self._lock:
+            self.recent.append(span)
+        if self._writer is not None:
+            self._writer.log(span)
+        return span
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return summarize(list(self.recent))
+
+    def spans(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Recent finished spans of one trace."""
+        with self._lock:
+            return [s for s in self.recent if s["trace_id"] == trace_id]
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued spans to the file and stop the writer thread."""
+        if self._writer is not None:
+            self._writer.close(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return self._writer.stats() if self._writer is not None else {}
+
+
+_default_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _default_tracer
+    if _default_tracer is None:
+        _default_tracer = Tracer()
+        # Short-lived scripts (run_eval.py) would otherwise exit with spans still queued
+        atexit.register(_default_tracer.close)
+    return _default_tracer
+
+
+class TracingPlugin(BasePlugin):
+    """
+    ADK runner plugin that records a span around every agent run,
+    LLM call and tool invocation, with token usage from the model
+    responses. Register it on each runner:
+
+        InMemoryRunner(agent=..., app_name=..., plugins=[TracingPlugin()])
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None, name: str = "conciergex_tracing"):
+        super().__init__(name=name)
+        self.tracer = tracer or get_tracer()
+        self._open: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+
+    def _push(self, key: tuple, span: Dict[str, Any]) -> None:
+        self._open[key].append(span)
+
+    def _pop(self, key: tuple) -> Optional[Dict[str, Any]]:
+        stack = self._open.get(key)
+        if not stack:
+            return None
+        span = stack.pop()
+        if not stack:
+            del self._open[key]
+        return span
+
+    # ---------------- agents ----------------
+    async def before_agent_callback(self, *, agent, callback_context):
+        span = self.tracer.start("agent", agent.name, invocation_id=callback_context.invocation_id)
+        self._push(("agent", callback_context.invocation_id, agent.name), span)
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        # An LLM span left open means a before_model callback answered
+        # without calling the model (e.g. the orchestrator fast path).
+        llm_key = ("llm", callback_context.invocation_id, agent.name)
+        while (span := self._pop(llm_key)) is not None:
+            self.tracer.end(span, status="short_circuit")
+
+        span = self._pop(("agent", callback_context.invocation_id, agent.name))
+        if span is not None:
+            self.tracer.end(span)
+        return None
+
+    # ---------------- model calls ----------------
+    async def before_model_callback(self, *, callback_context, llm_request):
+        instruction = getattr(llm_request.config, "system_instruction", None) or ""
+        span = self.tracer.start(
+            "llm",
+            callback_context.agent_name,
+            invocation_id=callback_context.invocation_id,
+            model=llm_request.model,
+            instruction_chars=len(str(instruction)),
+            instruction_tokens_est=estimate_tokens(str(instruction)),
+            contents=len(llm_request.contents),
+        )
+        self._push(("llm", callback_context.invocation_id, callback_context.agent_name), span)
+        return None
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if getattr(llm_response, "partial", False):
+            return None
+
+        span = self._pop(("llm", callback_context.invocation_id, callback_context.agent_name))
+        if span is None:
+            return None
+
+        usage = llm_response.usage_metadata
+        self.tracer.end(
+            span,
+            status="error" if llm_response.error_code else "ok",
+            prompt_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            output_tokens=(usage.candidates_token_count or 0) if usage else 0,
+        )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        span = self._pop(("llm", callback_context.invocation_id, callback_context.agent_name))
+        if span is not None:
+            self.tracer.end(span, status="error", error=str(error))
+        return None
+
+    # ---------------- tools ----------------
+    def _tool_key(self, tool_context) -> tuple:
+        return ("tool", tool_context.invocation_id, tool_context.function_call_id)
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        span = self.tracer.start(
+            "tool",
+            tool.name,
+            invocation_id=tool_context.invocation_id,
+            agent=tool_context.agent_name,
+        )
+        self._push(self._tool_key(tool_context), span)
+        return None
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        span = self._pop(self._tool_key(tool_context))
+        if span is not None:
+            status = "error" if isinstance(result, dict) and result.get("status") in ("error", "timeout") else "ok"
+            self.tracer.end(span, status=status, result_chars=len(json.dumps(result, default=str)))
+        return None
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        span = self._pop(self._tool_key(tool_context))
+        if span is not None:
+            self.tracer.end(span, status="error", error=str(error))
+        return None
@@ -7,36 +7,137 @@ using InMemoryRunner (compatible with your google-adk version).
 Provides:
 - GET  /.well-known/agent.json  → A2A Agent Card
 - POST /execute                 → A2A Execution Endpoint
+- POST /execute/stream          → Same, streamed as Server-Sent Events
+- POST /execute/batch           → Many inputs at once, run concurrently
+- GET  /health                  → Cheap liveness/load probe (no model call),
+                                  including the start-up timing report
+- GET  /metrics                 → Per-agent / LLM / tool span summary, model tier stats
+
+Every request is logged (route, latency, output size) to
+logs/requests.jsonl without blocking; replay_requests.py re-runs a log.
+
+Replies are parsed once and returned as canonical JSON; a malformed reply
+is repaired locally and, failing that, regenerated once by the model.
+
+Each client gets its own ADK session (X-Client-Id header or "user_id",
+plus optional "session_id"). Model work is bounded by a worker pool:
+requests beyond the queue limit get HTTP 429, slow runs get HTTP 504.
+Sub-agent calls inherit the request deadline (agents/deadlines.py): a
+slow planning/agenda call is cancelled in time for the orchestrator to
+answer, and timeouts are reported as structured JSON.
+Each client address is also rate limited by a token bucket (HTTP 429
+with Retry-After), and identical concurrent /execute requests share one run.
+Behind a proxy, A2A_TRUSTED_PROXY_HOPS takes the address from
+X-Forwarded-For; A2A_RATE_KEY_HEADER keys the bucket on a header set by
+a trusted gateway instead.
+
+/execute/batch runs a list of inputs through the same path as /execute,
+at most A2A_BATCH_PARALLELISM at a time, and returns per-item results in
+input order (or, with "stream": true, as SSE events as each finishes).
+Each item costs one rate-limit token: the first is charged up front (HTTP
+429 when none is left) and later items wait for theirs, so a batch runs
+at the client's sustained rate. Items get their own session unless they
+name one (items sharing a session run one after another), and per-item
+user ids are scoped under the caller's id.
 """
 
 import os
-from fastapi import FastAPI
+import math
+import time
+import uuid
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+# Imported before ADK so the start-up clock covers the heavy imports
+from agents.startup import startup
+
 # ADK Imports (your current ADK version supports InMemoryRunner only)
 from google.adk.runners import InMemoryRunner
 from agents.orchestrator import OrchestratorAgent
+from agents.json_utils import clean_output
+from agents.response_cache import ResponseCache, normalize_prompt, run_cached
+from agents.streaming import pump, sse_format, stream_run
+from agents.sessions import SessionPool
+from agents.concurrency import ConcurrencyGate, QueueFullError, RateLimitedError, SingleFlight, TokenBucket
+from agents.tracing import TracingPlugin, get_tracer
+from agents.deadlines import DeadlineExceededError, deadline_scope, tool_latency
+from agents.models import client_stats, tier_stats
+from agents.plan_index import get_plan_index
+from agents.request_log import get_request_logger, log_request
+
 
+startup.mark("imports")
 
 # ---------------------------------------------------------
 # Load environment variables (MUST COME BEFORE agent init)
 # ---------------------------------------------------------
 load_dotenv()
 
-if not os.getenv("GOOGLE_API_KEY"):
+# Replay mode serves recorded cassettes and needs no key
+if not os.getenv("GOOGLE_API_KEY") and os.getenv("CONCIERGEX_MODEL_BACKEND") != "replay":
     raise RuntimeError("GOOGLE_API_KEY not found. Add it to .env.")
 
 
 # ---------------------------------------------------------
 # Initialize ConciergeX Root Agent
 # ---------------------------------------------------------
-agent = OrchestratorAgent()
+# Sub-agents are built lazily on first use (agents/lazy.py)
+with startup.phase("orchestrator"):
+    agent = OrchestratorAgent()
 
-runner = InMemoryRunner(
-    agent=agent,
-    app_name="agents"
-)
+with startup.phase("runner"):
+    runner = InMemoryRunner(
+        agent=agent,
+        app_name="agents",
+        plugins=[TracingPlugin()],
+    )
+
+with startup.phase("caches"):
+    # Repeated plans/agendas are served without a model round trip
+    response_cache = ResponseCache(near_duplicate_threshold=0.9)
+    # Similar past plans are reused by PlanningAgent itself (agents/plan_index.py)
+    plan_index = get_plan_index()
+
+
+# ---------------------------------------------------------
+# Sessions & concurrency limits (override via environment)
+# ---------------------------------------------------------
+MAX_CONCURRENCY = int(os.getenv("A2A_MAX_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("A2A_MAX_QUEUE", "16"))
+REQUEST_TIMEOUT = float(os.getenv("A2A_REQUEST_TIMEOUT", "60"))
+MAX_SESSIONS = int(os.getenv("A2A_MAX_SESSIONS", "1000"))
+
+# Per-client token bucket: sustained requests/second and burst size
+RATE_PER_SECOND = float(os.getenv("A2A_RATE_PER_SECOND", "2"))
+RATE_BURST = int(os.getenv("A2A_RATE_BURST", "10"))
+# Identical concurrent requests share one run: "session" coalesces only
+# within a client session; "global" across clients (stateless dashboards).
+COALESCE_SCOPE = os.getenv("A2A_COALESCE_SCOPE", "session")
+# Behind N trusted reverse proxies / load balancers, the client address
+# is the N-th X-Forwarded-For entry from the right (entries further left
+# are client-supplied). 0 = use the peer address.
+TRUSTED_PROXY_HOPS = int(os.getenv("A2A_TRUSTED_PROXY_HOPS", "0"))
+# Header set by a trusted gateway (e.g. "X-Client-Id") that names the
+# rate-limit bucket. Unset = callers cannot choose their bucket.
+RATE_KEY_HEADER = os.getenv("A2A_RATE_KEY_HEADER", "")
+
+# /execute/batch: items run concurrently per batch, up to this many.
+# Always below the worker pool, so one batch never takes every slot.
+BATCH_PARALLELISM = max(1, min(
+    int(os.getenv("A2A_BATCH_PARALLELISM", str(MAX_CONCURRENCY // 2))),
+    MAX_CONCURRENCY - 1,
+))
+BATCH_MAX_ITEMS = int(os.getenv("A2A_BATCH_MAX_ITEMS", "100"))
+
+sessions = SessionPool(runner, max_sessions=MAX_SESSIONS)
+gate = ConcurrencyGate(max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE)
+limiter = TokenBucket(rate=RATE_PER_SECOND, burst=RATE_BURST)
+flights = SingleFlight()
 
 
 # ---------------------------------------------------------
@@ -52,6 +153,92 @@ app = FastAPI(
 # Input model for A2A requests
 class A2ARequest(BaseModel):
     input: str
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class BatchItem(BaseModel):
+    input: str
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    user_id: Optional[str] = None
+    parallelism: Optional[int] = None
+    stream: bool = False
+
+
+def client_address(request: Request) -> Optional[str]:
+    """The peer address, or the one recorded by A2A_TRUSTED_PROXY_HOPS trusted proxies."""
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [a.strip() for a in request.headers.get("X-Forwarded-For", "").split(",") if a.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else None
+
+
+def resolve_client(req, request: Request):
+    """(user_id, session_id) for a request; header wins over body, then client address."""
+    user_id = (
+        request.headers.get("X-Client-Id")
+        or req.user_id
+        or client_address(request)
+        or "anonymous"
+    )
+    return user_id, getattr(req, "session_id", None) or "default"
+
+
+def rate_key(request: Request) -> str:
+    """
+    Rate-limit identity: the A2A_RATE_KEY_HEADER value when that trusted
+    header is configured, else the client address. Never the caller-chosen
+    X-Client-Id / user_id by default (a new id per request would get a
+    fresh bucket).
+    """
+    if RATE_KEY_HEADER and request.headers.get(RATE_KEY_HEADER):
+        return f"{RATE_KEY_HEADER}:{request.headers[RATE_KEY_HEADER]}"
+    return client_address(request) or "unknown"
+
+
+def busy_body(e: Exception) -> Dict[str, Any]:
+    return {"error": "busy", "message": str(e)}
+
+
+def busy_response(e: Exception) -> JSONResponse:
+    return JSONResponse(status_code=429, content=busy_body(e), headers={"Retry-After": "1"})
+
+
+def rate_limited_response(e: RateLimitedError) -> JSONResponse:
+    return JSONResponse(status_code=429, content={"error": "rate_limited", "message": str(e)},
+                        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
+def flight_key(text: str, user_id: str, session_id: str):
+    scope = (user_id, session_id) if COALESCE_SCOPE == "session" else ()
+    return (normalize_prompt(text), *scope)
+
+
+def error_response(status: int, body: Dict[str, Any]) -> JSONResponse:
+    """Busy (429) and timeout (504) bodies from execute_core as HTTP responses."""
+    headers = {"Retry-After": "1"} if status == 429 else None
+    return JSONResponse(status_code=status, content=body, headers=headers)
+
+
+async def run_with_deadline(coro_fn, seconds: float = REQUEST_TIMEOUT):
+    """
+    Await coro_fn() under a request deadline; sub-agent tools see it via
+    agents/deadlines.py. Returns (result, tool timeouts); raises
+    DeadlineExceededError (after cancelling the run) when time runs out.
+    """
+    t0 = time.perf_counter()
+    with deadline_scope(seconds) as deadline:
+        try:
+            result = await asyncio.wait_for(coro_fn(), timeout=seconds)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(deadline, (time.perf_counter() - t0) * 1000.0)
+    return result, deadline.timeouts
 
 
 # ---------------------------------------------------------
@@ -63,54 +250,276 @@ async def agent_card():
         "name": "ConciergeX A2A Agent",
         "description": "Manual A2A wrapper around OrchestratorAgent",
         "version": "1.0",
-        "endpoints": ["/execute"],
+        "endpoints": ["/execute", "/execute/stream", "/execute/batch", "/health", "/metrics"],
         "input_modes": ["text"],
         "output_modes": ["json"]
     }
 
 
+# ---------------------------------------------------------
+# HEALTH ENDPOINT — never touches the model
+# ---------------------------------------------------------
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "workers": gate.stats(),
+        "rate_limit": limiter.stats(),
+        "coalescing": flights.stats(),
+        "sessions": len(sessions),
+        "cache": {"hits": response_cache.hits, "misses": response_cache.misses},
+        "plan_index": {"entries": len(plan_index), "hits": plan_index.hits, "misses": plan_index.misses},
+        "request_log": get_request_logger().stats(),
+        "trace_log": get_tracer().stats(),
+        "startup": dict(startup.summary(), models=client_stats()),
+    }
+
+
+# ---------------------------------------------------------
+# METRICS ENDPOINT — span summary from the tracing plugin,
+# plus per-tier model latency / escalation counts and per-tool
+# latency / timeout / hedge counts
+# ---------------------------------------------------------
+@app.get("/metrics")
+async def metrics():
+    return {"spans": get_tracer().summary(), "tiers": tier_stats.summary(), "tools": tool_latency.summary()}
+
+
+# ---------------------------------------------------------
+# EXECUTION CORE — shared by /execute and /execute/batch
+# ---------------------------------------------------------
+async def execute_core(text: str, user_id: str, session_id: str, source: str = "a2a") -> Tuple[int, Dict[str, Any]]:
+    """
+    (HTTP status, body) for one input: coalesced with identical in-flight
+    requests, bounded by the worker pool and the request deadline, logged.
+    """
+    started = time.time()
+
+    def log(status, output=None, **extra):
+        log_request(source, text, started, output, status, user_id=user_id, session_id=session_id, **extra)
+
+    async def compute():
+        async with gate.slot():
+            await sessions.acquire(user_id, session_id)
+
+            # Run pipeline via ADK (cache-aware)
+            return await run_with_deadline(lambda: run_cached(
+                runner, text, response_cache, user_id=user_id, session_id=session_id, regenerate=True,
+            ))
+
+    try:
+        # Identical in-flight requests wait for the same run
+        (raw_text, tool_timeouts), coalesced = await flights.do(flight_key(text, user_id, session_id), compute)
+    except QueueFullError as e:
+        log("busy")
+        return 429, busy_body(e)
+    except DeadlineExceededError as e:
+        log("timeout", tool_timeouts=len(e.body["tool_timeouts"]))
+        return 504, e.body
+
+    if not raw_text:
+        log("empty")
+        return 200, {"output": "No textual response found."}
+
+    output = clean_output(raw_text)
+    log("ok", output, coalesced=coalesced, tool_timeouts=len(tool_timeouts))
+    body = {"output": output, "coalesced": coalesced}
+    if tool_timeouts:
+        body["tool_timeouts"] = tool_timeouts
+    return 200, body
+
+
 # ---------------------------------------------------------
 # EXECUTION ENDPOINT — CLEAN JSON OUTPUT
 # ---------------------------------------------------------
 @app.post("/execute")
-async def execute(req: A2ARequest):
-    # Run pipeline via ADK
-    events = await runner.run_debug(req.input)
+async def execute(req: A2ARequest, request: Request):
+    user_id, session_id = resolve_client(req, request)
 
-    # Extract usable text from last event
-    raw_text = None
     try:
-        parts = events[-1].content.parts
-        for p in parts:
-            if hasattr(p, "text") and p.text:
-                raw_text = p.text.strip()
-                break
-    except:
-        pass
+        limiter.acquire(rate_key(request))
+    except RateLimitedError as e:
+        log_request("a2a", req.input, time.time(), None, "rate_limited", user_id=user_id, session_id=session_id)
+        return rate_limited_response(e)
 
-    if not raw_text:
-        return {"output": "No textual response found."}
+    status, body = await execute_core(req.input, user_id, session_id)
+    return body if status == 200 else error_response(status, body)
+
+
+# ---------------------------------------------------------
+# BATCH ENDPOINT — many inputs, bounded parallelism,
+# per-item results (in order, or streamed as they finish)
+# ---------------------------------------------------------
+async def run_batch_item(index: int, item: BatchItem, batch: Dict[str, Any]) -> Dict[str, Any]:
+    client_id = batch["client_id"]
+    # Item users live under the caller's id: no access to other users' sessions or preferences
+    user_id = f"{client_id}/{item.user_id}" if item.user_id else client_id
+    # A fresh session per item, so items never share history or memory by accident
+    session_id = item.session_id or f"batch-{batch['id']}-{index}"
+    t0 = time.perf_counter()
+
+    # One token per item; the first was charged when the batch was accepted
+    if index > 0:
+        await limiter.wait(batch["rate_key"])
+
+    async with batch["session_locks"][(user_id, session_id)], batch["semaphore"]:
+        try:
+            status, body = await execute_core(item.input, user_id, session_id, source="a2a_batch")
+        except Exception as e:  # one bad item must not fail the batch
+            status, body = 500, {"error": "internal", "message": f"{type(e).__name__}: {e}"}
+
+    result = {
+        "index": index,
+        "session_id": session_id,
+        "status": "ok" if status == 200 else body.get("error", "error"),
+        "http_status": status,
+        "latency_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    }
+    result.update(body if status == 200 else {"error": body})
+    return result
+
+
+def batch_summary(results: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+    ok = sum(1 for r in results if r["status"] == "ok")
+    return {"total": len(results), "ok": ok, "failed": len(results) - ok,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1)}
+
+
+@app.post("/execute/batch")
+async def execute_batch(req: BatchRequest, request: Request):
+    client_id, _ = resolve_client(req, request)
+
+    if not req.items:
+        return JSONResponse(status_code=400, content={"error": "empty_batch", "message": "No items to run."})
+    if len(req.items) > BATCH_MAX_ITEMS:
+        return JSONResponse(status_code=413, content={
+            "error": "batch_too_large",
+            "message": f"{len(req.items)} items; at most {BATCH_MAX_ITEMS} per batch.",
+        })
+
+    try:
+        limiter.acquire(rate_key(request))
+    except RateLimitedError as e:
+        return rate_limited_response(e)
+
+    parallelism = max(1, min(req.parallelism or BATCH_PARALLELISM, BATCH_PARALLELISM))
+    batch = {
+        "id": uuid.uuid4().hex[:12],
+        "client_id": client_id,
+        "rate_key": rate_key(request),
+        "semaphore": asyncio.Semaphore(parallelism),
+        # Items naming the same session run one after another
+        "session_locks": defaultdict(asyncio.Lock),
+    }
+    started = time.perf_counter()
+    jobs = [run_batch_item(i, item, batch) for i, item in enumerate(req.items)]
+
+    if not req.stream:
+        results = await asyncio.gather(*jobs)
+        return {"results": results, "summary": dict(batch_summary(results, started), parallelism=parallelism)}
+
+    async def event_source():
+        tasks = [asyncio.ensure_future(job) for job in jobs]
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                results.append(result)
+                yield sse_format("item", result)
+            yield sse_format("done", dict(batch_summary(results, started), parallelism=parallelism))
+        finally:
+            # Client went away: stop the items that have not finished
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------
+# STREAMING ENDPOINT — SERVER-SENT EVENTS
+# Emits tool_call / tool_result / partial events while the
+# runner works, then one "final" event with the clean JSON.
+# ---------------------------------------------------------
+@app.post("/execute/stream")
+async def execute_stream(req: A2ARequest, request: Request):
+    user_id, session_id = resolve_client(req, request)
+    started = time.time()
+
+    def log(status, output=None):
+        log_request("a2a_stream", req.input, started, output, status, user_id=user_id, session_id=session_id)
+
+    try:
+        limiter.acquire(rate_key(request))
+    except RateLimitedError as e:
+        log("rate_limited")
+        return rate_limited_response(e)
+
+    # Overload is still a plain 429 before streaming starts...
+    try:
+        gate.check()
+    except QueueFullError as e:
+        log("busy")
+        return busy_response(e)
+
+    async def event_source():
+        # ...but the slot is taken here, so a client that disconnects before
+        # the body starts never holds one; the finally below always frees it.
+        try:
+            await gate.acquire()
+        except QueueFullError as e:
+            log("busy")
+            yield sse_format("error", busy_body(e))
+            return
 
-    # -------------------------------
-    # CLEAN OUTPUT FOR STREAMLIT
-    # Remove markdown fences like:
-    # ```json
-    # { ... }
-    # ```
-    # -------------------------------
-    cleaned = raw_text
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = None
+        try:
+            with deadline_scope(REQUEST_TIMEOUT) as deadline:
+                await sessions.acquire(user_id, session_id)
+                # One task runs the whole stream (it inherits the deadline);
+                # the deadline applies to the queue reads here
+                events = stream_run(runner, req.input, response_cache, user_id=user_id, session_id=session_id)
+                producer = asyncio.create_task(pump(events, queue))
+                while True:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout=deadline.remaining())
+                    except asyncio.TimeoutError:
+                        log("timeout")
+                        error = DeadlineExceededError(deadline, (deadline.seconds - deadline.remaining()) * 1000.0)
+                        yield sse_format("error", error.body)
+                        break
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
 
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`").strip()
+                    data = item["data"]
+                    if item["event"] == "final":
+                        output = data.get("output")
+                        data = dict(data, output=clean_output(output) if output else "No textual response found.")
+                        if deadline.timeouts:
+                            data["tool_timeouts"] = deadline.timeouts
+                        log("ok" if output else "empty", output and data["output"])
+                    yield sse_format(item["event"], data)
+        finally:
+            if producer is not None:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            gate.release()
 
-        # Remove leading "json"
-        if cleaned.startswith("json"):
-            cleaned = cleaned[4:].strip()
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # remove any remaining triple-backticks
-    cleaned = cleaned.replace("```json", "").replace("```", "").strip()
 
-    return {"output": cleaned}
+startup.mark_ready()
+print(startup.format())
 
 
 # ---------------------------------------------------------
@@ -121,5 +530,6 @@ if __name__ == "__main__":
     print("🚀 Manual A2A server running at http://localhost:8001")
     print("🔗 Agent Card: http://localhost:8001/.well-known/agent.json")
     print("⚡ Execute via: POST http://localhost:8001/execute")
+    print("📡 Stream via:  POST http://localhost:8001/execute/stream")
     uvicorn.run(app, host="0.0.0.0", port=8001)
 
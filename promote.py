@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import mlflow
+import mlflow.sklearn
+from mlflow.tracking import MlflowClient
+
+from train import (
+    EXPERIMENT_NAME,
+    REGISTERED_MODEL_NAME,
+    load_data,
+    train_test_split_data,
+    eval_metrics,
+)
+
+
+# 1. Basic configuration
+HOLDOUT_PATH = os.path.join("data", "holdout.csv")
+CACHE_PATH = os.path.join("monitoring", "promotion_cache.json")
+
+# A challenger must beat the champion's RMSE by at least this fraction ...
+PROMOTION_MARGIN = 0.02
+# ... without being more than this many times slower to serve.
+MAX_LATENCY_RATIO = 2.0
+
+# Versions eligible as challengers ("None" is MLflow's unstaged stage)
+CHALLENGER_STAGES = ("None", "Staging")
+
+LATENCY_REPEATS = 20
+MAX_WORKERS = 4
+
+
+def load_holdout(path=HOLDOUT_PATH):
+    """
+    Returns the shared holdout set (X, y).
+    The split is materialised once so every version is scored on identical rows.
+    """
+    if not os.path.exists(path):
+        df = load_data()
+        _, X_test, _, y_test = train_test_split_data(df)
+        holdout = X_test.copy()
+        holdout["Salary"] = y_test
+        holdout.to_csv(path, index=False)
+
+    holdout = pd.read_csv(path)
+    return holdout[["YearsExperience"]], holdout["Salary"]
+
+
+def data_hash(path=HOLDOUT_PATH):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def load_cache(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def cache_key(mv, holdout_hash):
+    return f"{mv.version}:{mv.run_id}:{holdout_hash}"
+
+
+def load_version(version):
+    return mlflow.sklearn.load_model(f"models:/{REGISTERED_MODEL_NAME}/{version}")
+
+
+def score_version(mv, X, y):
+    """
+    Loads one registered version, predicts on the holdout and
+    returns a JSON-serialisable result entry.
+    """
+    model = load_version(mv.version)
+    preds = model.predict(X)
+    rmse, mae, r2 = eval_metrics(y, preds)
+
+    return {
+        "version": int(mv.version),
+        "run_id": mv.run_id,
+        "predictions": [float(p) for p in preds],
+        "rmse": float(rmse),
+        "mae": float(mae),
+        "r2": float(r2),
+    }
+
+
+def evaluate_versions(client, X, y, holdout_hash, workers=MAX_WORKERS):
+    """
+    Scores every registered version, reusing cached predictions for
+    versions already evaluated on this holdout. A version that fails to
+    load or predict is reported and skipped. Returns (results, stages).
+    """
+    versions = client.search_model_versions(f"name='{REGISTERED_MODEL_NAME}'")
+    cache = load_cache()
+
+    pending = [mv for mv in versions if cache_key(mv, holdout_hash) not in cache]
+    print(f"{len(versions)} registered versions, {len(pending)} need scoring.")
+
+    scored = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {mv: pool.submit(score_version, mv, X, y) for mv in pending}
+        for mv, future in futures.items():
+            try:
+                cache[cache_key(mv, holdout_hash)] = future.result()
+                scored += 1
+            except Exception as e:
+                print(f"Skipping v{mv.version}: {e}")
+
+    if scored:
+        save_cache(cache)
+
+    # Latency is never reused from the cache (older entries may still carry it)
+    results = [
+        {k: v for k, v in cache[cache_key(mv, holdout_hash)].items() if k != "latency_ms_per_row"}
+        for mv in versions if cache_key(mv, holdout_hash) in cache
+    ]
+    stages = {int(mv.version): mv.current_stage for mv in versions}
+    return results, stages
+
+
+def select_candidates(results, stages):
+    """
+    (champion, challenger): the Production version and the best version by
+    RMSE among those still in CHALLENGER_STAGES (Archived ones never return).
+    """
+    champion = next((r for r in results if stages.get(r["version"]) == "Production"), None)
+    challengers = [r for r in results if stages.get(r["version"], "None") in CHALLENGER_STAGES]
+    challenger = min(challengers, key=lambda r: (r["rmse"], -r["version"])) if challengers else None
+    return champion, challenger
+
+
+def measure_latencies(entries, X, repeats=LATENCY_REPEATS):
+    """
+    Sets "latency_ms_per_row" (median) on each entry. Runs after scoring,
+    on this thread only, and times the models in turn within each round,
+    so every candidate sees the same machine load.
+    """
+    models = [load_version(e["version"]) for e in entries]
+    timings = [[] for _ in entries]
+    for _ in range(repeats):
+        for model, samples in zip(models, timings):
+            start = time.perf_counter()
+            model.predict(X)
+            samples.append(time.perf_counter() - start)
+
+    for entry, samples in zip(entries, timings):
+        entry["latency_ms_per_row"] = float(np.median(samples)) * 1000.0 / max(len(X), 1)
+
+
+def pick_winner(champion, challenger, margin=PROMOTION_MARGIN, max_latency_ratio=MAX_LATENCY_RATIO):
+    """
+    True when the challenger should be promoted: it clears the RMSE margin
+    and the latency budget (both latencies from `measure_latencies`).
+    """
+    if challenger is None:
+        return False
+    if champion is None:
+        return True
+
+    improvement = (champion["rmse"] - challenger["rmse"]) / max(champion["rmse"], 1e-9)
+    latency_ok = challenger["latency_ms_per_row"] <= champion["latency_ms_per_row"] * max_latency_ratio
+    return improvement >= margin and latency_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Champion/challenger evaluation for the model registry.")
+    parser.add_argument("--margin", type=float, default=PROMOTION_MARGIN,
+                        help="Minimum relative RMSE improvement required to promote.")
+    parser.add_argument("--max-latency-ratio", type=float, default=MAX_LATENCY_RATIO,
+                        help="Maximum challenger/champion serving latency ratio.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not transition stages.")
+    args = parser.parse_args()
+
+    # 2. Set MLflow experiment & registry client
+    mlflow.set_experiment(EXPERIMENT_NAME)
+    client = MlflowClient()
+
+    # 3. Shared holdout
+    X, y = load_holdout()
+    holdout_hash = data_hash()
+
+    # 4. Score all versions in parallel (incremental via cache)
+    results, stages = evaluate_versions(client, X, y, holdout_hash, workers=args.workers)
+
+    # 5. Serving latency of the two candidates, measured sequentially
+    champion, challenger = select_candidates(results, stages)
+    try:
+        measure_latencies([r for r in (champion, challenger) if r is not None], X)
+    except Exception as e:
+        print(f"\nLatency measurement failed ({e}); nothing promoted.")
+        return
+
+    print("\nVersion summary:")
+    for r in sorted(results, key=lambda r: r["version"]):
+        latency = f"{r['latency_ms_per_row']:.4f} ms/row" if "latency_ms_per_row" in r else "not measured"
+        print(
+            f"v{r['version']} [{stages.get(r['version'], 'None')}] -> RMSE={r['rmse']:.2f}, "
+            f"MAE={r['mae']:.2f}, R2={r['r2']:.4f}, latency={latency}"
+        )
+
+    # 6. Decide & transition
+    promote = pick_winner(champion, challenger, margin=args.margin, max_latency_ratio=args.max_latency_ratio)
+
+    if challenger is None:
+        print("\nNo challenger available.")
+        return
+
+    if not promote:
+        print(f"\nChampion v{champion['version']} retained (challenger v{challenger['version']} did not clear the margin).")
+        return
+
+    print(f"\nPromoting v{challenger['version']} to Production.")
+    if args.dry_run:
+        print("Dry run: no stage transition performed.")
+        return
+
+    client.transition_model_version_stage(
+        name=REGISTERED_MODEL_NAME,
+        version=str(challenger["version"]),
+        stage="Production",
+        archive_existing_versions=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
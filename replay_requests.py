@@ -0,0 +1,169 @@
+"""
+replay_requests.py
+------------------
+Re-runs captured orchestrator traffic (logs/requests.jsonl, written by
+agents/request_log.py) against a running A2A server.
+
+Requests are sent at their original relative times, scaled by --speed
+(2 = twice as fast, 0 = back to back), so load tests reproduce real
+traffic shapes. Each replayed request is compared with its recorded
+status and output type, which doubles as a regression check.
+
+Every replayed request comes from this one machine, so the server's
+per-client rate limit (A2A_RATE_PER_SECOND / A2A_RATE_BURST) would
+throttle the whole replay as a single client. Start the server with
+A2A_RATE_KEY_HEADER=X-Client-Id so each replayed user gets its own bucket
+(or raise the limits). Throttled requests (HTTP 429) are reported
+separately and are not counted as regressions.
+
+Run:
+    A2A_RATE_KEY_HEADER=X-Client-Id python manual_a2a_agent.py   # in one terminal
+    python replay_requests.py --speed 2                          # in another
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from agents.json_utils import response_type
+from agents.stats import percentile
+
+# Same default as agents/request_log.py (not imported: it pulls in ADK)
+LOG_PATH = os.environ.get("CONCIERGEX_REQUEST_LOG", os.path.join("logs", "requests.jsonl"))
+DEFAULT_URL = "http://localhost:8001/execute"
+MAX_WORKERS = 16
+# Server answered 429 (rate limited or queue full): load, not a regression
+THROTTLED = "429"
+
+
+def load_records(path, source=None, limit=None):
+    """Logged requests (oldest first), optionally filtered by source."""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not record.get("input"):
+                continue
+            if source and record.get("source") != source:
+                continue
+            records.append(record)
+
+    records.sort(key=lambda r: r["ts"])
+    return records[:limit] if limit else records
+
+
+def replay_one(session, url, record, keep_ids, timeout):
+    user_id = record.get("user_id") or "anonymous"
+    if not keep_ids:
+        # Separate sessions/preferences from the real users by default
+        user_id = f"replay-{user_id}"
+
+    body = {"input": record["input"], "session_id": record.get("session_id")}
+    t0 = time.perf_counter()
+    try:
+        resp = session.post(url, json=body, headers={"X-Client-Id": user_id}, timeout=timeout)
+        status = "ok" if resp.ok else str(resp.status_code)
+        output = resp.json().get("output", "") if resp.ok else ""
+    except requests.RequestException as e:
+        status, output = type(e).__name__, ""
+
+    return {
+        "latency_ms": (time.perf_counter() - t0) * 1000.0,
+        "status": status,
+        "output_type": response_type(output) if output else None,
+        "recorded_status": record.get("status"),
+        "recorded_type": record.get("output_type"),
+        "recorded_latency_ms": record.get("latency_ms"),
+    }
+
+
+def replay(records, url=DEFAULT_URL, speed=1.0, workers=MAX_WORKERS, keep_ids=False, timeout=120):
+    """Send every record at (ts - first_ts) / speed seconds; returns per-request results."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    results = []
+    lock = threading.Lock()
+
+    def run(record):
+        result = replay_one(session, url, record, keep_ids, timeout)
+        with lock:
+            results.append(result)
+            done = len(results)
+        print(f"[{done}/{len(records)}] {result['status']:<8} {result['latency_ms']:8.0f} ms  {record['input'][:60]!r}")
+
+    start = time.monotonic()
+    first_ts = records[0]["ts"] if records else 0.0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            if speed > 0:
+                delay = (record["ts"] - first_ts) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, record)
+
+    return results
+
+
+def print_summary(results, elapsed):
+    latencies = [r["latency_ms"] for r in results]
+    recorded = [r["recorded_latency_ms"] for r in results if r["recorded_latency_ms"] is not None]
+    statuses = Counter(r["status"] for r in results)
+    throttled = statuses.get(THROTTLED, 0)
+    changed = [
+        r for r in results
+        if r["recorded_status"] == "ok" and r["status"] != THROTTLED
+        and (r["status"] != "ok" or r["output_type"] != r["recorded_type"])
+    ]
+
+    print("\n========== Replay summary ==========")
+    print(f"Requests      : {len(results)} in {elapsed:.1f}s")
+    print(f"Statuses      : {dict(statuses)}")
+    print(f"Latency (ms)  : p50 {percentile(latencies, 50):.0f}  p95 {percentile(latencies, 95):.0f}")
+    if recorded:
+        print(f"Recorded (ms) : p50 {percentile(recorded, 50):.0f}  p95 {percentile(recorded, 95):.0f}")
+    print(f"Throttled     : {throttled} (HTTP 429: rate limit or queue full)")
+    print(f"Regressions   : {len(changed)} (status or output type differs from the recording)")
+    if throttled:
+        print("Throttled requests were not compared; see A2A_RATE_KEY_HEADER in the module docstring.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured ConciergeX requests against the A2A server.")
+    parser.add_argument("--log", default=LOG_PATH, help="Request log to replay.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--speed", type=float, default=1.0, help="Timing scale; 0 sends back to back.")
+    parser.add_argument("--source", default=None, help="Only replay records from this source (a2a, a2a_stream, streamlit).")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Max requests in flight.")
+    parser.add_argument("--keep-ids", action="store_true", help="Reuse the recorded user ids.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"No request log at {args.log}.")
+
+    records = load_records(args.log, source=args.source, limit=args.limit)
+    if not records:
+        raise SystemExit("Nothing to replay.")
+
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"▶️ Replaying {len(records)} requests (recorded over {span:.1f}s) at speed {args.speed}")
+
+    t0 = time.monotonic()
+    results = replay(records, url=args.url, speed=args.speed, workers=args.workers, keep_ids=args.keep_ids)
+    print_summary(results, time.monotonic() - t0)
+
+
+if __name__ == "__main__":
+    main()
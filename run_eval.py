@@ -0,0 +1,499 @@
+"""
+run_eval.py
+-----------
+Concurrent offline evaluation of the ConciergeX orchestrator.
+
+Runs every case in evals/conciergex_eval.yaml (optionally several times),
+checks that the whole reply is JSON (strict json.loads, as the
+orchestrator promises), carries the expected fields and matches its
+response schema (agents/json_utils.py), and records
+per-case latency, token usage and tool-call counts (from the tracing
+spans, so sub-agent runs are included).
+
+Cases with the same `session:` key run in order in one session; each
+run uses a fresh plan index and preference store.
+
+Writes eval_report.md and eval_report.html (same layout as before, plus
+a performance section with p50/p95 latency). Failed runs whose reply
+would pass once fences or prose are stripped are counted as "repairable".
+
+Run:
+    python run_eval.py --repeat 3 --concurrency 4
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from html import escape
+
+import yaml
+from dotenv import load_dotenv
+
+from google.adk.runners import InMemoryRunner
+from agents.orchestrator import OrchestratorAgent
+from agents.json_utils import extract_json, validate
+from agents.response_cache import final_text
+from agents.tracing import TracingPlugin, get_tracer, trace_scope
+from agents.models import tier_stats
+from agents.stats import percentile
+
+
+EVAL_PATH = os.path.join("evals", "conciergex_eval.yaml")
+MD_REPORT_PATH = "eval_report.md"
+HTML_REPORT_PATH = "eval_report.html"
+
+
+# ----------------------------------------
+# Load YAML
+# ----------------------------------------
+def load_yaml(path):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+# ----------------------------------------
+# Output checks
+# ----------------------------------------
+def parse_output(text):
+    """The reply must be exactly one JSON value: no fences, no surrounding prose."""
+    return json.loads(text.strip())
+
+
+def parse_lenient(text):
+    """First JSON value in the reply (fences and trailing prose tolerated, no repair)."""
+    data = extract_json(text)
+    if data is None:
+        raise ValueError("no JSON value found")
+    return data
+
+
+def check_output(text, expect, parse=parse_output):
+    """Returns (success, parsed_or_text, reason)."""
+    if text is None:
+        return False, None, "No output."
+
+    try:
+        parsed = parse(text)
+    except Exception as e:
+        if expect.get("json", True):
+            return False, text, f"Invalid JSON: {e}"
+        return True, text, ""
+
+    missing = [f for f in expect.get("fields", []) if not isinstance(parsed, dict) or f not in parsed]
+    if missing:
+        return False, parsed, f"Missing fields: {', '.join(missing)}"
+
+    errors = validate(parsed) if isinstance(parsed, dict) else []
+    if errors:
+        return False, parsed, f"Schema: {'; '.join(errors[:3])}"
+    return True, parsed, ""
+
+
+# ----------------------------------------
+# Span metrics
+# ----------------------------------------
+def span_metrics(spans):
+    """
+    Token usage and tool calls of one case run, from its tracing spans.
+    The trace includes the AgentTool child runners (planning_agent,
+    agenda_agent), not just the orchestrator's own events.
+    """
+    prompt_tokens = sum(s.get("prompt_tokens", 0) for s in spans if s["kind"] == "llm")
+    output_tokens = sum(s.get("output_tokens", 0) for s in spans if s["kind"] == "llm")
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": prompt_tokens + output_tokens,
+        "tool_calls": sum(1 for s in spans if s["kind"] == "tool"),
+    }
+
+
+# ----------------------------------------
+# Isolation
+# ----------------------------------------
+def isolate_stores(workdir):
+    """
+    Point the plan index and the preference store at empty files in
+    `workdir`, so an eval run neither reuses plans indexed by earlier
+    runs (measuring cache hits) nor reads or writes real preferences.
+    Must run before the first request; both stores are opened lazily.
+    """
+    os.environ["CONCIERGEX_PLAN_INDEX"] = os.path.join(workdir, "plan_index.db")
+    os.environ["CONCIERGEX_PREFERENCES_DB"] = os.path.join(workdir, "preferences.db")
+
+
+def case_groups(cases):
+    """
+    Cases sharing a `session:` key run in file order in one session
+    (e.g. "Memory Usage" needs the window stored by "Memory
+    Personalization"); every other case is a group of its own.
+    Returns lists of (case index, case).
+    """
+    groups, by_session = [], {}
+    for i, case in enumerate(cases):
+        key = case.get("session")
+        if key is None:
+            groups.append([(i, case)])
+        elif key in by_session:
+            by_session[key].append((i, case))
+        else:
+            by_session[key] = [(i, case)]
+            groups.append(by_session[key])
+    return groups
+
+
+# ----------------------------------------
+# Run cases concurrently
+# ----------------------------------------
+async def run_one(runner, case, semaphore, session_id):
+    """One execution of one case in the given session."""
+    async with semaphore:
+        start = time.perf_counter()
+        with trace_scope() as trace_id:
+            try:
+                events = await runner.run_debug(
+                    case["input"], user_id=session_id, session_id=session_id, quiet=True
+                )
+            except Exception as e:
+                return dict(
+                    span_metrics(get_tracer().spans(trace_id)),
+                    success=False,
+                    repairable=False,
+                    output=f"❌ Agent crashed: {e}",
+                    reason=str(e),
+                    latency_ms=(time.perf_counter() - start) * 1000.0,
+                )
+        latency_ms = (time.perf_counter() - start) * 1000.0
+
+    text = final_text(events)
+    success, output, reason = check_output(text, case.get("expect", {}))
+    metrics = span_metrics(get_tracer().spans(trace_id))
+    return dict(
+        metrics, success=success, output=output, reason=reason, latency_ms=latency_ms,
+        # Fails the strict parse only because of fences / prose around valid JSON
+        repairable=not success and check_output(text, case.get("expect", {}), parse=parse_lenient)[0],
+    )
+
+
+async def run_group(runner, group, semaphore):
+    """
+    One execution of a group, in order, in a fresh session. The session
+    id doubles as the user id, so stored preferences stay per group run.
+    """
+    session_id = f"eval-{uuid.uuid4().hex}"
+    return [(i, await run_one(runner, case, semaphore, session_id)) for i, case in group]
+
+
+async def run_eval(path=EVAL_PATH, repeat=1, concurrency=4):
+    spec = load_yaml(path)
+    cases = spec.get("cases", [])
+
+    runner = InMemoryRunner(agent=OrchestratorAgent(), app_name="agents", plugins=[TracingPlugin()])
+    semaphore = asyncio.Semaphore(concurrency)
+
+    print(f"🚀 Running {len(cases)} evaluation cases x{repeat} (concurrency={concurrency})...\n")
+
+    jobs = [run_group(runner, group, semaphore) for group in case_groups(cases) for _ in range(repeat)]
+    runs = [[] for _ in cases]
+    for group_runs in await asyncio.gather(*jobs):
+        for i, run in group_runs:
+            runs[i].append(run)
+
+    results = []
+    for case, case_runs in zip(cases, runs):
+        latencies = [r["latency_ms"] for r in case_runs]
+        failed = [r for r in case_runs if not r["success"]]
+
+        result = {
+            "name": case["name"],
+            "success": not failed,
+            "output": (failed or case_runs)[0]["output"],
+            "reason": failed[0]["reason"] if failed else "",
+            "runs": len(case_runs),
+            "passed_runs": len(case_runs) - len(failed),
+            "repairable_runs": sum(1 for r in failed if r["repairable"]),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "avg_total_tokens": sum(r["total_tokens"] for r in case_runs) / len(case_runs),
+            "avg_tool_calls": sum(r["tool_calls"] for r in case_runs) / len(case_runs),
+            "latencies_ms": latencies,
+        }
+        results.append(result)
+
+        status = "✔ PASS" if result["success"] else f"❌ FAIL ({result['reason']})"
+        print(f"▶ {case['name']}: {status}  p50={result['p50_ms']:.0f}ms p95={result['p95_ms']:.0f}ms")
+
+    passed = sum(r["success"] for r in results)
+    print("------------------------------------------------------------")
+    print(f"🏁 Completed: {passed}/{len(results)} passed.")
+
+    return results
+
+
+# -------------------------------------------------------------
+# Helpers for summary stats
+# -------------------------------------------------------------
+def summarize(cases):
+    total = len(cases)
+    passed = sum(1 for c in cases if c["success"])
+    failed = total - passed
+    rate = (passed / total * 100) if total else 0.0
+    return total, passed, failed, rate
+
+
+def overall_latency(cases):
+    latencies = [ms for c in cases for ms in c.get("latencies_ms", [])]
+    return percentile(latencies, 50), percentile(latencies, 95)
+
+
+def case_note(out, limit):
+    if isinstance(out, dict):
+        return out.get("message") or out.get("notes") or out.get("type") or ""
+    note = (out.strip().replace("\n", " ") if isinstance(out, str) else str(out))
+    return note[:limit] + "..." if len(note) > limit else note
+
+
+# -------------------------------------------------------------
+# Markdown report builder
+# -------------------------------------------------------------
+def build_markdown_report(cases, title="ConciergeX Evaluation Report"):
+    total, passed, failed, rate = summarize(cases)
+    p50, p95 = overall_latency(cases)
+    ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+    md = []
+    md.append(f"# {title}\n")
+    md.append(f"- Generated: `{ts}`")
+    md.append(f"- Total cases: **{total}**")
+    md.append(f"- ✅ Passed: **{passed}**")
+    md.append(f"- ❌ Failed: **{failed}**")
+    md.append(f"- 📊 Pass rate: **{rate:.1f}%**")
+    md.append(f"- ⏱️ Latency p50 / p95: **{p50:.0f} ms / {p95:.0f} ms**\n")
+
+    # Summary table
+    md.append("## Scenario Summary\n")
+    md.append("| # | Scenario | Status | Notes |")
+    md.append("|---|----------|--------|-------|")
+
+    for i, c in enumerate(cases, 1):
+        status = "✅ PASS" if c["success"] else "❌ FAIL"
+        note = (c.get("reason") or case_note(c["output"], 80)).replace("|", "\\|")  # protect Markdown table
+        md.append(f"| {i} | {c['name']} | {status} | {note} |")
+
+    # Performance table
+    md.append("\n## Performance\n")
+    md.append("| # | Scenario | Runs | Passed | Repairable | p50 (ms) | p95 (ms) | Avg tokens | Avg tool calls |")
+    md.append("|---|----------|------|--------|------------|----------|----------|------------|----------------|")
+
+    for i, c in enumerate(cases, 1):
+        md.append(
+            f"| {i} | {c['name']} | {c.get('runs', 1)} | {c.get('passed_runs', int(c['success']))} | "
+            f"{c.get('repairable_runs', 0)} | {c.get('p50_ms', 0):.0f} | {c.get('p95_ms', 0):.0f} | "
+            f"{c.get('avg_total_tokens', 0):.0f} | {c.get('avg_tool_calls', 0):.1f} |"
+        )
+
+    md.append("\n## Detailed Results\n")
+
+    for i, c in enumerate(cases, 1):
+        status_emoji = "✅" if c["success"] else "❌"
+        status_text = "PASS" if c["success"] else "FAIL"
+        md.append(f"### {status_emoji} {c['name']}\n")
+        md.append(f"**Status:** {status_emoji} {status_text}\n")
+
+        md.append("**Output:**\n")
+        md.append("```json")
+        try:
+            md.append(json.dumps(c["output"], indent=2, ensure_ascii=False))
+        except TypeError:
+            md.append(str(c["output"]))
+        md.append("```\n")
+
+    return "\n".join(md)
+
+
+# -------------------------------------------------------------
+# HTML report builder (dark, clean, modern)
+# -------------------------------------------------------------
+def build_html_report(cases, title="ConciergeX Evaluation Report"):
+    total, passed, failed, rate = summarize(cases)
+    p50, p95 = overall_latency(cases)
+    ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+    # Summary rows
+    summary_rows = []
+    perf_rows = []
+    for i, c in enumerate(cases, 1):
+        status_text = "PASS" if c["success"] else "FAIL"
+        emoji = "✅" if c["success"] else "❌"
+        note = c.get("reason") or case_note(c["output"], 100)
+
+        summary_rows.append(
+            f"<tr>"
+            f"<td>{i}</td>"
+            f"<td>{escape(c['name'])}</td>"
+            f"<td class='{status_text.lower()}'>{emoji} {status_text}</td>"
+            f"<td>{escape(note)}</td>"
+            f"</tr>"
+        )
+        perf_rows.append(
+            f"<tr>"
+            f"<td>{i}</td>"
+            f"<td>{escape(c['name'])}</td>"
+            f"<td>{c.get('passed_runs', int(c['success']))}/{c.get('runs', 1)}</td>"
+            f"<td>{c.get('repairable_runs', 0)}</td>"
+            f"<td>{c.get('p50_ms', 0):.0f}</td>"
+            f"<td>{c.get('p95_ms', 0):.0f}</td>"
+            f"<td>{c.get('avg_total_tokens', 0):.0f}</td>"
+            f"<td>{c.get('avg_tool_calls', 0):.1f}</td>"
+            f"</tr>"
+        )
+
+    # Detailed sections
+    details_html = []
+    for i, c in enumerate(cases, 1):
+        status_text = "PASS" if c["success"] else "FAIL"
+        emoji = "✅" if c["success"] else "❌"
+
+        out = c["output"]
+        try:
+            raw_json = json.dumps(out, indent=2, ensure_ascii=False)
+        except TypeError:
+            raw_json = str(out)
+
+        details_html.append(
+            f"""
+        <section class="case">
+            <h2>{emoji} {escape(c['name'])}</h2>
+            <p><strong>Status:</strong> {emoji} {status_text}</p>
+            <pre><code>{escape(raw_json)}</code></pre>
+        </section>
+        """
+        )
+
+    details_html = "\n".join(details_html)
+
+    html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"/>
+<title>{escape(title)}</title>
+<style>
+body {{
+  background: #0d1117;
+  color: #e6edf3;
+  font-family: Arial, sans-serif;
+  padding: 2rem;
+}}
+.card {{
+  background: #161b22;
+  padding: 2rem;
+  border-radius: 10px;
+  border: 1px solid #30363d;
+  max-width: 1100px;
+  margin: auto;
+}}
+.pass {{ color: #4ade80; font-weight: bold; }}
+.fail {{ color: #f87171; font-weight: bold; }}
+
+table {{
+  width: 100%;
+  border-collapse: collapse;
+  margin: 1.5rem 0;
+}}
+td, th {{
+  padding: 0.6rem;
+  border-bottom: 1px solid #30363d;
+}}
+pre {{
+  background: #0d1117;
+  padding: 1rem;
+  border-radius: 8px;
+  overflow-x: auto;
+  border: 1px solid #30363d;
+}}
+.case {{
+  margin-top: 2rem;
+}}
+</style>
+</head>
+<body>
+<div class="card">
+  <h1>{escape(title)}</h1>
+  <p>Generated: <code>{ts}</code></p>
+  <p>
+    <strong>Total:</strong> {total} |
+    <strong class="pass">Passed:</strong> {passed} |
+    <strong class="fail">Failed:</strong> {failed} |
+    <strong>Rate:</strong> {rate:.1f}% |
+    <strong>Latency p50 / p95:</strong> {p50:.0f} ms / {p95:.0f} ms
+  </p>
+
+  <h2>Summary</h2>
+  <table>
+    <tr><th>#</th><th>Scenario</th><th>Status</th><th>Notes</th></tr>
+    {''.join(summary_rows)}
+  </table>
+
+  <h2>Performance</h2>
+  <table>
+    <tr><th>#</th><th>Scenario</th><th>Passed</th><th>Repairable</th><th>p50 (ms)</th><th>p95 (ms)</th><th>Avg tokens</th><th>Avg tool calls</th></tr>
+    {''.join(perf_rows)}
+  </table>
+
+  <h2>Details</h2>
+  {details_html}
+</div>
+</body>
+</html>
+"""
+    return html
+
+
+# -------------------------------------------------------------
+# MAIN EXECUTION
+# -------------------------------------------------------------
+def print_tier_summary():
+    """Model calls per tier (fast / strong) and how often the cascade escalated."""
+    tiers = tier_stats.summary()
+    if not tiers:
+        return
+    print("\n📶 Model tiers")
+    for tier, row in sorted(tiers.items()):
+        print(
+            f"  {tier:<7} calls={row['calls']:.0f}  avg={row['avg_ms']:.0f} ms  "
+            f"escalations={row.get('escalations', 0):.0f}  cost=${row['cost_usd']:.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ConciergeX evaluation suite concurrently.")
+    parser.add_argument("--path", default=EVAL_PATH)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (for p50/p95).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max cases in flight.")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    with tempfile.TemporaryDirectory(prefix="conciergex-eval-") as workdir:
+        isolate_stores(workdir)
+        cases = asyncio.run(run_eval(args.path, repeat=args.repeat, concurrency=args.concurrency))
+
+    with open(MD_REPORT_PATH, "w", encoding="utf-8") as f:
+        f.write(build_markdown_report(cases))
+
+    with open(HTML_REPORT_PATH, "w", encoding="utf-8") as f:
+        f.write(build_html_report(cases))
+
+    print(f"🎉 Reports generated: {MD_REPORT_PATH} & {HTML_REPORT_PATH}")
+    print_tier_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,46 +3,37 @@
 ############################
 
 import streamlit as st
-import asyncio
+import concurrent.futures
 import json
+import os
+import time
 
 from google.adk.runners import InMemoryRunner
 from agents.orchestrator import OrchestratorAgent
+from agents.json_utils import IncrementalJsonParser, parse_json, parse_reply, strip_fences
+from agents.response_cache import DEFAULT_USER_ID, ResponseCache, run_cached
+from agents.pipeline import DirectPipeline
+from agents.preferences import get_store as get_preference_store
+from agents.scheduler import build_agenda
+from agents.async_runtime import AsyncRuntime
+from agents.request_log import log_request
+from agents.tracing import TracingPlugin, TRACE_PATH, load_spans, summarize
 
-
-#############################################
-# Async Helper
-#############################################
-def run_sync(awaitable):
-    """Run async ADK coroutine inside Streamlit safely."""
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    if loop.is_running():
-        new_loop = asyncio.new_event_loop()
-        return new_loop.run_until_complete(awaitable)
-    else:
-        return loop.run_until_complete(awaitable)
+RUN_TIMEOUT_SECONDS = 120
 
 
 #############################################
-# Strip Markdown Fences (```)
+# Async Helper
 #############################################
-def strip_markdown_fences(txt: str) -> str:
-    if not isinstance(txt, str):
-        return txt
-
-    s = txt.strip()
+@st.cache_resource
+def get_runtime():
+    """One background event loop per process, shared by every rerun and session."""
+    return AsyncRuntime()
 
-    if s.startswith("```") and s.endswith("```"):
-        s = s.strip("`")
-        if s.startswith("json"):
-            s = s[4:].strip()
 
-    return s
+def run_sync(awaitable, timeout=RUN_TIMEOUT_SECONDS):
+    """Run async ADK coroutine on the persistent background loop."""
+    return get_runtime().submit(awaitable, timeout=timeout)
 
 
 #############################################
@@ -50,20 +41,14 @@ def strip_markdown_fences(txt: str) -> str:
 #############################################
 def sanitize_adk_json(txt: str):
     """Before feeding JSON to another agent, remove ADK-reserved fields."""
-    cleaned = strip_markdown_fences(txt)
-
-    try:
-        data = json.loads(cleaned)
-
-        if isinstance(data, dict):
-            data.pop("tool", None)
-            data.pop("type", None)
-            return data
+    data = parse_json(txt)
 
+    if isinstance(data, dict):
+        data.pop("tool", None)
+        data.pop("type", None)
         return data
 
-    except Exception:
-        return txt
+    return data if data is not None else txt
 
 
 #############################################
@@ -82,7 +67,7 @@ def json_plan_to_markdown(parsed):
 
     md.append("---")
 
-    for week in parsed.get("plan", []):
+    for week in parsed.get("plan") or parsed.get("weeks") or []:
         wk = week.get("week", "")
         focus = week.get("focus", "")
         tasks = week.get("tasks", [])
@@ -160,53 +145,68 @@ def pretty_response(txt: str) -> str:
     if not isinstance(txt, str):
         txt = str(txt)
 
-    cleaned = strip_markdown_fences(txt)
+    # One parse (with local repair) + schema check for every renderer
+    reply = parse_reply(txt)
+    if reply.data is None:
+        return strip_fences(txt)
 
-    try:
-        parsed = json.loads(cleaned)
+    parsed = reply.data
+    renderers = {
+        "plan": json_plan_to_markdown,
+        "agenda": json_agenda_to_markdown,
+        "guardrail": json_guardrail_to_markdown,
+        "pipeline": lambda p: json_plan_to_markdown(p["plan"]) + "\n\n" + json_agenda_to_markdown(p["agenda"]),
+    }
 
-        # Planning agent output
-        if isinstance(parsed, dict) and "plan" in parsed:
-            return json_plan_to_markdown(parsed)
+    if reply.kind in renderers and not reply.errors:
+        return renderers[reply.kind](parsed)
 
-        # Agenda agent output
-        if isinstance(parsed, dict) and "days" in parsed:
-            return json_agenda_to_markdown(parsed)
+    # Any other (or schema-invalid) JSON → pretty-print
+    formatted = json.dumps(parsed, indent=4, ensure_ascii=False)
+    note = f"⚠️ Response did not match the {reply.kind} schema: {'; '.join(reply.errors[:3])}\n\n" if reply.errors else ""
+    return f"{note}```json\n{formatted}\n```"
 
-        # Guardrail output
-        if isinstance(parsed, dict) and parsed.get("type") == "guardrail":
-            return json_guardrail_to_markdown(parsed)
 
-        # Any other JSON → pretty-print
-        formatted = json.dumps(parsed, indent=4, ensure_ascii=False)
-        return f"```json\n{formatted}\n```"
+#############################################
+# Initialize ADK + Streamlit
+#############################################
+st.set_page_config(page_title="ConciergeX Agentic AI", layout="wide")
 
-    except Exception:
-        return cleaned
+@st.cache_resource
+def get_runner():
+    """Build the orchestrator and its runner once, not on every rerun."""
+    return InMemoryRunner(agent=OrchestratorAgent(), app_name="conciergex", plugins=[TracingPlugin()])
 
 
-#############################################
-# Extract text from ADK events
-#############################################
-def extract_text_from_events(events):
-    for ev in reversed(events):
-        try:
-            parts = getattr(ev.content, "parts", [])
-            for p in parts:
-                if hasattr(p, "text") and p.text:
-                    return p.text
-        except:
-            continue
-    return "No textual response found."
+runner = get_runner()
 
 
-#############################################
-# Initialize ADK + Streamlit
-#############################################
-st.set_page_config(page_title="ConciergeX Agentic AI", layout="wide")
+@st.cache_resource
+def get_response_cache():
+    """Process-wide cache so repeated plans/agendas survive reruns."""
+    return ResponseCache(near_duplicate_threshold=0.9)
 
-orchestrator = OrchestratorAgent()
-runner = InMemoryRunner(agent=orchestrator, app_name="conciergex")
+
+response_cache = get_response_cache()
+
+
+@st.cache_resource
+def get_direct_pipeline():
+    """PlanningAgent + per-week AgendaAgent fan-out, built once per process."""
+    return DirectPipeline()
+
+
+def ask(cmd: str) -> str:
+    """Send one message through the cache-aware runner and return its text."""
+    started = time.time()
+    try:
+        raw = run_sync(run_cached(runner, cmd, response_cache, regenerate=True))
+    except concurrent.futures.TimeoutError:
+        log_request("streamlit", cmd, started, status="timeout", user_id=DEFAULT_USER_ID)
+        return f"⏱️ Request timed out after {RUN_TIMEOUT_SECONDS}s."
+
+    log_request("streamlit", cmd, started, raw, "ok" if raw else "empty", user_id=DEFAULT_USER_ID)
+    return raw or "No textual response found."
 
 
 #############################################
@@ -221,41 +221,60 @@ st.caption("Multi-agent orchestration using Google ADK + Gemini 2.5 Flash Lite")
 # A2A Auto-Detection Helpers (FINAL VERSION)
 #############################################
 import requests
+from requests.adapters import HTTPAdapter
+
+A2A_BASE_URL = "http://localhost:8001"
+DISCOVERY_TTL_SECONDS = 30
 
-def check_a2a_server(base_url="http://localhost:8001"):
-    """Detect A2A server and return the working POST execution endpoint."""
-    agent_card_url = f"{base_url}/.well-known/agent.json"
 
-    # Step 1 — Check if A2A server is alive
+@st.cache_resource
+def get_http_session():
+    """Pooled keep-alive HTTP session shared by all A2A calls."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=DISCOVERY_TTL_SECONDS, show_spinner=False)
+def discover_a2a(base_url=A2A_BASE_URL):
+    """
+    Detect the A2A server from its agent card only (no POST, so no model call).
+    Cached for DISCOVERY_TTL_SECONDS; returns (alive, endpoint, message).
+    """
     try:
-        r = requests.get(agent_card_url, timeout=1.5)
+        r = get_http_session().get(f"{base_url}/.well-known/agent.json", timeout=2)
         if r.status_code != 200:
-            return False, None
-    except:
-        return False, None
-
-    # Step 2 — Known execution endpoints
-    candidate_endpoints = [
-        "/execute",           # ✔ Your ADK manual A2A endpoint
-        "/",                  # Some ADK versions use root POST
-        "/process",           # JSON-RPC style
-        "/run"                # Rare but valid
-    ]
-
-    # Step 3 — Try each endpoint until one succeeds
-    for ep in candidate_endpoints:
-        try:
-            url = f"{base_url}{ep}"
-            test = requests.post(url, json={"input": "ping"}, timeout=1.5)
+            return False, None, "A2A server not responding to agent card."
+        card = r.json()
+    except Exception:
+        return False, None, "Unable to connect to A2A server."
 
-            # If endpoint exists, any of these are acceptable:
-            if test.status_code in (200, 400, 422):
-                return True, url
-        except:
-            continue
+    if "/execute" not in card.get("endpoints", ["/execute"]):
+        return True, None, "Agent card does not advertise /execute."
 
-    # Agent card OK but no valid POST endpoint detected
-    return True, None
+    return True, f"{base_url}/execute", ""
+
+
+def iter_sse(resp):
+    """Yield (event, data) pairs from a streaming Server-Sent Events response."""
+    event, data_lines = "message", []
+
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                try:
+                    yield event, json.loads("\n".join(data_lines))
+                except Exception:
+                    pass
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].strip())
 
 
 #############################################
@@ -268,7 +287,8 @@ tabs = st.tabs([
     "📋 Tasks",
     "🚨 Guardrails",
     "🔗 Pipeline",
-    "🔌 A2A Agent"
+    "🔌 A2A Agent",
+    "📈 Traces"
 ])
 
 
@@ -280,8 +300,7 @@ with tabs[0]:
     msg = st.text_area("Enter message:", height=130)
 
     if st.button("Send to Orchestrator"):
-        events = run_sync(runner.run_debug(msg))
-        raw = extract_text_from_events(events)
+        raw = ask(msg)
         st.markdown(pretty_response(raw))
 
 
@@ -294,8 +313,7 @@ with tabs[1]:
 
     if st.button("Generate Plan"):
         cmd = f"[force_planning]\n{msg}"
-        events = run_sync(runner.run_debug(cmd))
-        raw = extract_text_from_events(events)
+        raw = ask(cmd)
         st.markdown(pretty_response(raw))
 
 
@@ -308,13 +326,22 @@ with tabs[2]:
 
     if st.button("Generate Agenda"):
         sanitized = sanitize_adk_json(msg)
+
+        # Plan JSON → local scheduler (no model call); free text → AgendaAgent
+        agenda = None
         if isinstance(sanitized, dict):
-            sanitized = json.dumps(sanitized, ensure_ascii=False)
+            try:
+                window = get_preference_store().get(DEFAULT_USER_ID, "study_window")
+                agenda = build_agenda(sanitized, study_window=window)
+            except ValueError:
+                sanitized = json.dumps(sanitized, ensure_ascii=False)
 
-        cmd = f"[force_agenda]\n{sanitized}"
-        events = run_sync(runner.run_debug(cmd))
-        raw = extract_text_from_events(events)
-        st.markdown(pretty_response(raw))
+        if agenda is not None:
+            st.markdown(json_agenda_to_markdown(agenda))
+        else:
+            cmd = f"[force_agenda]\n{sanitized}"
+            raw = ask(cmd)
+            st.markdown(pretty_response(raw))
 
 
 #############################################
@@ -330,8 +357,7 @@ with tabs[3]:
             sanitized = json.dumps(sanitized, ensure_ascii=False)
 
         cmd = f"[force_tasks]\n{sanitized}"
-        events = run_sync(runner.run_debug(cmd))
-        raw = extract_text_from_events(events)
+        raw = ask(cmd)
         st.markdown(pretty_response(raw))
 
 
@@ -343,8 +369,7 @@ with tabs[4]:
     msg = st.text_area("Enter dangerous request:", height=130)
 
     if st.button("Test Guardrails"):
-        events = run_sync(runner.run_debug(msg))
-        raw = extract_text_from_events(events)
+        raw = ask(msg)
         st.markdown(pretty_response(raw))
 
 
@@ -355,28 +380,83 @@ with tabs[5]:
     st.subheader("🔗 Full Pipeline")
 
     msg = st.text_area("Enter planning request:", height=130)
+    mode = st.radio(
+        "Pipeline mode:",
+        ["Direct (plan + local scheduler)", "Orchestrator (plan, then agenda)"],
+        horizontal=True,
+    )
 
     if st.button("Run Full Pipeline"):
-        # Step 1: Plan
-        plan_cmd = f"[force_planning]\n{msg}"
-        plan_events = run_sync(runner.run_debug(plan_cmd))
-        plan_raw = extract_text_from_events(plan_events)
+        if mode.startswith("Direct"):
+            try:
+                result = run_sync(get_direct_pipeline().run(msg, user_id=DEFAULT_USER_ID))
+            except Exception as e:
+                st.error(f"Pipeline failed: {e}")
+            else:
+                st.info("Weekly Plan:")
+                st.markdown(json_plan_to_markdown(result["plan"]))
 
-        st.info("Weekly Plan:")
-        st.markdown(pretty_response(plan_raw))
+                st.success("Generated Agenda:")
+                st.markdown(json_agenda_to_markdown(result["agenda"]))
+        else:
+            # Step 1: Plan
+            plan_cmd = f"[force_planning]\n{msg}"
+            plan_raw = ask(plan_cmd)
 
-        # Step 2: Clean plan for agenda
-        cleaned = sanitize_adk_json(plan_raw)
-        if isinstance(cleaned, dict):
-            cleaned = json.dumps(cleaned, ensure_ascii=False)
+            st.info("Weekly Plan:")
+            st.markdown(pretty_response(plan_raw))
 
-        # Step 3: Agenda
-        agenda_cmd = f"[force_agenda]\n{cleaned}"
-        agenda_events = run_sync(runner.run_debug(agenda_cmd))
-        agenda_raw = extract_text_from_events(agenda_events)
+            # Step 2: Clean plan for agenda
+            cleaned = sanitize_adk_json(plan_raw)
+            if isinstance(cleaned, dict):
+                cleaned = json.dumps(cleaned, ensure_ascii=False)
 
-        st.success("Generated Agenda:")
-        st.markdown(pretty_response(agenda_raw))
+            # Step 3: Agenda (plan JSON → orchestrator's local schedule_agenda tool)
+            agenda_cmd = f"[force_agenda]\n{cleaned}"
+            agenda_raw = ask(agenda_cmd)
+
+            st.success("Generated Agenda:")
+            st.markdown(pretty_response(agenda_raw))
+
+
+#############################################
+# TAB 8 — Traces (per-agent latency / tokens)
+#############################################
+def trace_file_version(path=TRACE_PATH):
+    """(mtime, size) of the trace file; changes whenever spans are appended or rotated."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def cached_spans(version, path=TRACE_PATH):
+    """load_spans, re-read only when the file's (mtime, size) `version` changes."""
+    return load_spans(path)
+
+
+with tabs[7]:
+    st.subheader("📈 Per-Agent Traces")
+    st.caption(f"Spans from `{TRACE_PATH}` (Streamlit and A2A server runs).")
+
+    spans = cached_spans(trace_file_version())
+    if not spans:
+        st.info("No traces recorded yet. Run a request in any tab.")
+    else:
+        st.markdown("### Summary by agent / model call / tool")
+        st.dataframe(summarize(spans), use_container_width=True)
+
+        st.markdown("### Latest spans")
+        st.dataframe(
+            [
+                {k: s.get(k) for k in ("trace_id", "parent_id", "span_id", "kind", "name",
+                                       "duration_ms", "prompt_tokens", "output_tokens", "status")}
+                for s in spans[-50:][::-1]
+            ],
+            use_container_width=True,
+        )
 
 
 #############################################
@@ -394,38 +474,13 @@ with tabs[6]:
     ```
     """)
 
-    import requests
+    if st.button("🔄 Re-check server"):
+        discover_a2a.clear()
 
-    def detect_a2a():
-        base = "http://localhost:8001"
-        card = f"{base}/.well-known/agent.json"
-
-        # Check if server is alive
-        try:
-            r = requests.get(card, timeout=2)
-            if r.status_code != 200:
-                st.warning("🟡 A2A server not responding to agent card.")
-                return False, None
-        except:
-            st.warning("🟡 Unable to connect to A2A server.")
-            return False, None
+    alive, endpoint, message = discover_a2a()
 
-        # Check /execute only (since manual server uses ONLY this)
-        exec_url = f"{base}/execute"
-
-        try:
-            test = requests.post(exec_url, json={"input": "ping"}, timeout=2)
-
-            # Any response code means endpoint exists
-            if test.status_code in (200, 400, 422):
-                return True, exec_url
-
-        except:
-            pass
-
-        return True, None
-
-    alive, endpoint = detect_a2a()
+    if message:
+        st.warning(f"🟡 {message}")
 
     if not alive:
         st.error("🔴 A2A Server NOT Running.\nStart it with:\n`uvicorn manual_a2a_agent:app --port 8001`")
@@ -441,10 +496,43 @@ with tabs[6]:
 
     query = st.text_area("Enter request for A2A agent:", height=120)
 
+    stream = st.checkbox("Stream response (SSE)", value=True)
+
     if st.button("Send to A2A"):
         try:
-            resp = requests.post(endpoint, json={"input": query}, timeout=20)
-            output = resp.json().get("output", "")
+            if stream:
+                status = st.empty()
+                partial = st.empty()
+                parser = IncrementalJsonParser()
+                output = ""
+
+                with get_http_session().post(f"{endpoint}/stream", json={"input": query},
+                                   stream=True, timeout=(2, 120)) as resp:
+                    for event, data in iter_sse(resp):
+                        if event == "tool_call":
+                            status.info(f"🔧 Calling `{data.get('name')}`…")
+                        elif event == "tool_result":
+                            status.info(f"✅ `{data.get('name')}` finished")
+                        elif event == "partial":
+                            parser.feed(data.get("text", ""))
+                            snapshot = parser.snapshot()
+                            if snapshot is not None:
+                                partial.json(snapshot)
+                            else:
+                                partial.code(parser.buffer, language="json")
+                        elif event == "final":
+                            output = data.get("output", "")
+                        elif event == "error":
+                            st.error(f"A2A server error: {data.get('message', data)}")
+
+                status.empty()
+                partial.empty()
+            else:
+                resp = get_http_session().post(endpoint, json={"input": query}, timeout=20)
+                if resp.status_code in (429, 504):
+                    st.warning(f"A2A server: {resp.json().get('message', resp.status_code)}")
+                output = resp.json().get("output", "")
+
             st.markdown(pretty_response(output))
         except Exception as e:
             st.error(f"Error contacting A2A server: {e}")
@@ -0,0 +1,62 @@
+# tests/test_lazy.py
+# Lazily built sub-agent tools (agents/lazy.py) and the model factory's
+# start-up check (agents/models.py).
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import AgentTool
+
+from agents.lazy import LazyAgentTool
+from agents.models import build_model
+from agents.orchestrator import OrchestratorAgent
+from agents.response_cache import final_text
+
+
+def make_agent(name="helper"):
+    return LlmAgent(name=name, model="gemini-2.0-flash", description="Helps.", instruction="Help.")
+
+
+def test_declaration_does_not_build_the_agent():
+    calls = []
+    tool = LazyAgentTool(lambda: calls.append(1) or make_agent(), "helper", "Helps.")
+
+    declaration = tool._get_declaration()
+    assert declaration.name == "helper"
+    assert list(declaration.parameters.properties) == ["request"]
+    assert not tool.built and calls == []
+
+    assert isinstance(tool.tool, AgentTool)
+    assert tool.agent.name == "helper"
+    tool.agent
+    assert calls == [1]
+
+
+def test_pre_routed_request_builds_no_sub_agent(monkeypatch, tmp_path):
+    monkeypatch.setenv("CONCIERGEX_MODEL_BACKEND", "replay")
+    monkeypatch.setenv("CONCIERGEX_CASSETTE_DIR", str(tmp_path))
+    agent = OrchestratorAgent()
+    runner = InMemoryRunner(agent=agent, app_name="agents")
+    lazy_tools = [t for t in agent.tools if isinstance(t, LazyAgentTool)]
+
+    events = asyncio.run(runner.run_debug("How do I treat my heart pain?", quiet=True))
+    assert '"guardrail"' in final_text(events)
+    assert [t.built for t in lazy_tools] == [False, False]
+
+
+def test_factory_must_build_the_declared_agent():
+    tool = LazyAgentTool(lambda: make_agent("other"), "helper", "Helps.")
+    with pytest.raises(ValueError):
+        tool.agent
+
+
+@pytest.mark.parametrize("backend", ["live", "record"])
+def test_missing_api_key_fails_when_the_model_is_built(backend, monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="GOOGLE_API_KEY"):
+        build_model(backend=backend, tier="fast")
@@ -0,0 +1,135 @@
+# tests/test_models.py
+# Fast/strong cascade (agents/models.py) against stand-in model tiers.
+
+import asyncio
+from typing import List
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from agents.models import CascadeLlm, CassetteMissError, request_hash, tier_stats
+
+PLAN = '{"goal": "LLMs", "duration": "1 week", "plan": [{"week": "Week 1", "focus": "Basics", "tasks": ["Read"]}]}'
+
+
+def reply(text: str, partial: bool = False) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        partial=partial,
+        usage_metadata=None if partial else types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=100, candidates_token_count=20, total_token_count=120,
+        ),
+    )
+
+
+class FakeTier(BaseLlm):
+    """Replies with fixed text; streams it as two partials plus the final response."""
+
+    text: str = PLAN
+    error: object = None
+    requests: List[str] = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.requests.append(llm_request.model)
+        if self.error is not None:
+            raise self.error
+        if stream:
+            half = len(self.text) // 2
+            yield reply(self.text[:half], partial=True)
+            yield reply(self.text[half:], partial=True)
+        yield reply(self.text)
+
+
+def run(cascade: CascadeLlm, stream: bool = False) -> List[LlmResponse]:
+    request = LlmRequest(model="cascade", contents=[types.Content(role="user", parts=[types.Part(text="Plan")])])
+
+    async def collect():
+        return [r async for r in cascade.generate_content_async(request, stream=stream)]
+
+    return asyncio.run(collect())
+
+
+def texts(responses: List[LlmResponse]) -> List[str]:
+    return ["".join(p.text for p in r.content.parts) for r in responses]
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    tier_stats.reset()
+    yield
+    tier_stats.reset()
+
+
+def make(fast_text=PLAN, fast_error=None):
+    fast = FakeTier(model="fast-model", text=fast_text, error=fast_error, requests=[])
+    strong = FakeTier(model="strong-model", text=PLAN, requests=[])
+    return CascadeLlm(model="fast>strong", fast=fast, strong=strong), fast, strong
+
+
+def test_valid_fast_answer_passes_through():
+    cascade, fast, strong = make()
+    assert texts(run(cascade)) == [PLAN]
+    assert fast.requests == ["fast-model"] and strong.requests == []
+
+    stats = tier_stats.summary()
+    assert stats["fast"]["calls"] == 1 and stats["fast"].get("escalations", 0) == 0
+    assert stats["fast"]["prompt_tokens"] == 100
+    assert "strong" not in stats
+
+
+def test_schema_failure_escalates_to_the_strong_tier():
+    cascade, fast, strong = make(fast_text="Sure! Here is your plan.")
+    assert texts(run(cascade)) == [PLAN]
+    assert strong.requests == ["strong-model"]
+
+    stats = tier_stats.summary()
+    assert stats["fast"]["escalations"] == 1 and stats["fast"]["escalated_schema"] == 1
+    assert stats["strong"]["calls"] == 1
+
+
+def test_streamed_fast_partials_are_held_until_validated():
+    cascade, _, _ = make(fast_text="Sure! Here is your plan.")
+    responses = run(cascade, stream=True)
+    # Only the strong tier's chunks reach the client
+    assert "".join(texts([r for r in responses if r.partial])) == PLAN
+    assert texts([r for r in responses if not r.partial]) == [PLAN]
+
+
+def test_streamed_valid_answer_keeps_its_partials():
+    cascade, _, strong = make()
+    responses = run(cascade, stream=True)
+    assert [r.partial for r in responses] == [True, True, False]
+    assert strong.requests == []
+
+
+def test_api_error_escalates_but_a_cassette_miss_does_not():
+    cascade, _, strong = make(fast_error=genai_errors.ServerError(503, {"error": {"message": "busy"}}))
+    assert texts(run(cascade)) == [PLAN]
+    assert tier_stats.summary()["fast"]["escalated_error"] == 1
+
+    cascade, _, strong = make(fast_error=CassetteMissError("no cassette"))
+    with pytest.raises(CassetteMissError):
+        run(cascade)
+    assert strong.requests == []
+
+
+def tool_turn(call_id: str, task_id: int) -> LlmRequest:
+    # Only the task's own "id" differs between task ids
+    return LlmRequest(model="fast-model", contents=[
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=call_id, name="add_task", args={"title": "Read"},
+        ))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=call_id, name="add_task", response={"added": {"id": task_id, "title": "Read"}},
+        ))]),
+    ])
+
+
+def test_request_hash_ignores_call_ids_but_not_task_ids():
+    assert request_hash(tool_turn("adk-1", 3)) == request_hash(tool_turn("adk-2", 3))
+    assert request_hash(tool_turn("adk-1", 3)) != request_hash(tool_turn("adk-1", 4))
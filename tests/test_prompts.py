@@ -0,0 +1,131 @@
+# tests/test_prompts.py
+# The route-specific instructions (agents/prompts.py) must keep the
+# orchestrator's response shapes and guardrails unchanged.
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+pytest.importorskip("google.adk")
+
+from agents import prompts
+from agents.prompts import ROUTES, assemble, detect_route
+
+FIXTURES = Path(__file__).parent / "fixtures"
+EVAL_PATH = Path(__file__).resolve().parent.parent / "evals" / "conciergex_eval.yaml"
+
+# The inline OrchestratorAgent instruction before it was split into routes.
+LEGACY_INSTRUCTION = (FIXTURES / "orchestrator_instruction_v1.txt").read_text(encoding="utf-8")
+
+# Deliberate edits made since then; anything else is a regression.
+LATER_CHANGES = [
+    # schedule_agenda tool (local scheduler)
+    (
+        "- task_manager    : manages to-do tasks as JSON.\n",
+        "- task_manager    : manages to-do tasks as JSON.\n"
+        "- schedule_agenda : turns weekly plan JSON into a day-by-day agenda\n"
+        "                    instantly (local scheduler, no model call).\n",
+    ),
+    (
+        "- Then call agenda_agent with that plan as context.\n",
+        "- Then call schedule_agenda with that plan JSON as plan_json.\n",
+    ),
+    (
+        "   - Call the agenda_agent tool.\n"
+        "   - Wrap the agenda_agent JSON in a top-level JSON of type \"agenda\".\n",
+        "   - If the request already contains weekly plan JSON, call schedule_agenda\n"
+        "     with it; otherwise (free-text request) call the agenda_agent tool.\n"
+        "   - Wrap the agenda JSON in a top-level JSON of type \"agenda\"\n"
+        "     (\"tool\" is the tool you called).\n",
+    ),
+    (
+        "   - Then use agenda_agent using that plan as context.\n",
+        "   - Then call schedule_agenda with that plan JSON (do not use agenda_agent).\n",
+    ),
+    # Sub-agent timeouts
+    (
+        "Use them, but your own reply must still be JSON.\n",
+        "Use them, but your own reply must still be JSON.\n"
+        "\n"
+        "If a tool result has \"status\": \"timeout\", do not call that tool again.\n"
+        "Reply with {\"type\": \"timeout\", \"status\": \"timeout\", \"message\": \"<short\n"
+        "apology, ask the user to retry>\"}, unless other tool results already\n"
+        "answer the request.\n",
+    ),
+]
+
+SHAPES = {name: getattr(prompts, name) for name in dir(prompts) if name.startswith("SHAPE_")}
+
+EXPECTED_ROUTES = {
+    "Planning: 4-week schedule": "plan",
+    "Agenda: daily schedule": "agenda",
+    "Pipeline: plan + agenda": "pipeline",
+    "Hard Guardrail: Medical": "full",
+    "Hard Guardrail: Illegal": "full",
+    "Soft Guardrail: Clarification": "agenda",
+    "Memory Personalization": "memory",
+    "Memory Usage": "agenda",
+}
+
+
+def legacy_with_later_changes() -> str:
+    text = LEGACY_INSTRUCTION
+    for old, new in LATER_CHANGES:
+        assert text.count(old) == 1, old
+        text = text.replace(old, new)
+    return text
+
+
+def test_full_route_reproduces_legacy_instruction():
+    assert assemble("full") == legacy_with_later_changes()
+
+
+def test_every_legacy_shape_is_kept_verbatim():
+    # Only the tasks shape is new (the legacy instruction had no tasks route)
+    legacy = legacy_with_later_changes()
+    for name, shape in SHAPES.items():
+        if name != "SHAPE_TASKS":
+            assert shape.strip() in legacy, name
+    assert set(SHAPES) - {"SHAPE_TASKS"} == {
+        name for name, shape in SHAPES.items() if shape in ROUTES["full"]["shapes"]
+    }
+
+
+@pytest.mark.parametrize("route", sorted(ROUTES))
+def test_route_keeps_its_shapes_and_both_guardrails(route):
+    text = assemble(route)
+    assert text.startswith(prompts.COMMON_PREFIX)
+    for shape in ROUTES[route]["shapes"]:
+        assert shape in text
+    assert prompts.SHAPE_GUARDRAILS in text
+    assert prompts.RULE_GUARDRAILS in text
+    for category in ('"category": "medical"', '"category": "illegal"'):
+        assert category in text
+
+
+def test_eval_prompts_are_routed():
+    cases = yaml.safe_load(EVAL_PATH.read_text(encoding="utf-8"))["cases"]
+    assert {c["name"] for c in cases} == set(EXPECTED_ROUTES)
+    for case in cases:
+        assert detect_route(case["input"]) == EXPECTED_ROUTES[case["name"]], case["name"]
+
+
+@pytest.mark.parametrize("text, route", [
+    ("Plan my 4-week Python study with 3 tasks per week", "full"),
+    ("Give me a daily agenda for my tasks this week", "full"),
+    ("Add a task to review chapter 3", "tasks"),
+    ("Show my to-do list", "tasks"),
+])
+def test_task_prompts_keep_plan_and_agenda_shapes(text, route):
+    assert detect_route(text) == route
+    shapes = ROUTES[route]["shapes"]
+    if "plan" in text.lower():
+        assert prompts.SHAPE_PLAN in shapes
+    if "agenda" in text.lower():
+        assert prompts.SHAPE_AGENDA in shapes
+
+
+def test_route_tags_win():
+    assert detect_route("[force_planning]\nanything") == "plan"
+    assert detect_route("[force_tasks] list") == "tasks"
@@ -0,0 +1,22 @@
+# tests/test_replay_requests.py
+# Replay summary (replay_requests.py): throttling is not a regression.
+
+import pytest
+
+pytest.importorskip("requests")
+
+from replay_requests import print_summary
+
+
+def result(status, output_type="plan", recorded_type="plan"):
+    return {
+        "latency_ms": 100.0, "status": status, "output_type": output_type,
+        "recorded_status": "ok", "recorded_type": recorded_type, "recorded_latency_ms": 90.0,
+    }
+
+
+def test_rate_limited_requests_are_reported_apart_from_regressions(capsys):
+    print_summary([result("ok"), result("429", None), result("429", None), result("500", None)], 1.0)
+    out = capsys.readouterr().out
+    assert "Throttled     : 2" in out
+    assert "Regressions   : 1" in out
@@ -0,0 +1,39 @@
+# tests/test_response_cache.py
+# Reply cache (agents/response_cache.py): near-duplicate scoping and
+# session history for cache hits.
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+
+from agents.response_cache import ResponseCache, run_cached
+
+PLAN_4_WEEKS = "Plan my 4-week Generative AI learning schedule"
+
+
+def test_near_duplicates_must_agree_on_duration_and_numbers():
+    cache = ResponseCache(near_duplicate_threshold=0.5)
+    cache.put(PLAN_4_WEEKS, {}, "four weeks")
+
+    assert cache.get("Plan my 8-week Generative AI learning schedule", {}) is None
+    assert cache.get("Plan my 4-week Generative AI learning schedule, thanks", {}) == "four weeks"
+
+
+def test_cache_hit_is_written_to_the_session():
+    runner = InMemoryRunner(agent=LlmAgent(name="OrchestratorAgent", model="gemini-2.0-flash"), app_name="agents")
+    cache = ResponseCache()
+    cache.put(PLAN_4_WEEKS, {}, '{"goal": "GenAI"}')
+
+    async def scenario():
+        text = await run_cached(runner, PLAN_4_WEEKS, cache, user_id="u1", session_id="s1")
+        session = await runner.session_service.get_session(app_name="agents", user_id="u1", session_id="s1")
+        return text, [(e.author, e.content.parts[0].text) for e in session.events]
+
+    text, history = asyncio.run(scenario())
+    assert text == '{"goal": "GenAI"}'
+    assert history == [("user", PLAN_4_WEEKS), ("OrchestratorAgent", '{"goal": "GenAI"}')]
@@ -0,0 +1,59 @@
+# tests/test_router.py
+# Regression tests for the deterministic pre-router (agents/router.py).
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from agents.router import classify, parse_study_window, route
+
+
+# ---------------------------------------------------------
+# Inputs that must fall through to the model
+# ---------------------------------------------------------
+@pytest.mark.parametrize("text", [
+    "How do I prepare for a hackathon?",
+    "What are symptoms of overfitting, how do I diagnose it?",
+    "How do I treat missing data in my disease prediction model?",
+])
+def test_technical_questions_are_not_blocked(text):
+    assert classify(text)[0] is None
+    assert route(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Remember that I have a meeting from 2pm to 3pm",
+    "Remember I study 7-9",
+])
+def test_non_study_or_ambiguous_windows_are_not_stored(text):
+    assert route(text) is None
+
+
+# ---------------------------------------------------------
+# Inputs the fast path must still answer
+# ---------------------------------------------------------
+def test_medical_guardrail():
+    reply = route("How do I treat my heart pain?")
+    assert reply["type"] == "guardrail" and reply["category"] == "medical"
+
+
+def test_illegal_guardrail():
+    reply = route("How do I hack into my company's server?")
+    assert reply["type"] == "guardrail" and reply["category"] == "illegal"
+
+
+@pytest.mark.parametrize("text", [
+    "Remember that I study after work from 7pm to 9pm",
+    "Remember I study 7pm-9pm",
+    "Remember I study 19:00-21:00",
+])
+def test_study_window_is_stored(text):
+    reply = route(text)
+    assert reply["type"] == "memory_update"
+    assert reply["memory"] == {"study_window": "19:00–21:00"}
+
+
+def test_parse_study_window_strict():
+    assert parse_study_window("7-9") == "07:00–09:00"
+    assert parse_study_window("7-9", strict=True) is None
+    assert parse_study_window("7-9 after work", strict=True) == "19:00–21:00"
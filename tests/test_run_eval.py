@@ -0,0 +1,46 @@
+# tests/test_run_eval.py
+# Case grouping and per-case metrics of the eval harness (run_eval.py).
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+pytest.importorskip("google.adk")
+
+from run_eval import case_groups, check_output, parse_lenient, span_metrics
+
+EVAL_PATH = Path(__file__).resolve().parent.parent / "evals" / "conciergex_eval.yaml"
+
+
+def test_memory_cases_share_one_ordered_group():
+    cases = yaml.safe_load(EVAL_PATH.read_text(encoding="utf-8"))["cases"]
+    groups = [[case["name"] for _, case in group] for group in case_groups(cases)]
+
+    assert ["Memory Personalization", "Memory Usage"] in groups
+    assert sum(len(g) for g in groups) == len(cases)
+    assert all(len(g) == 1 for g in groups if "Memory Usage" not in g)
+
+
+def test_span_metrics_count_sub_agent_calls():
+    spans = [
+        {"kind": "agent", "name": "OrchestratorAgent"},
+        {"kind": "llm", "name": "OrchestratorAgent", "prompt_tokens": 100, "output_tokens": 10},
+        {"kind": "tool", "name": "planning_agent"},
+        {"kind": "llm", "name": "PlanningAgent", "prompt_tokens": 40, "output_tokens": 30},
+        {"kind": "llm", "name": "OrchestratorAgent", "prompt_tokens": 150, "output_tokens": 20},
+    ]
+    assert span_metrics(spans) == {
+        "prompt_tokens": 290, "output_tokens": 60, "total_tokens": 350, "tool_calls": 1,
+    }
+
+
+def test_strict_parse_fails_fenced_json_but_counts_it_repairable():
+    expect = {"fields": ["status", "type"]}
+    reply = '{"type": "guardrail", "category": "medical", "status": "blocked", "message": "No."}'
+
+    assert check_output(reply, expect)[0]
+    fenced = f"```json\n{reply}\n```"
+    success, _, reason = check_output(fenced, expect)
+    assert not success and reason.startswith("Invalid JSON")
+    assert check_output(fenced, expect, parse=parse_lenient)[0]
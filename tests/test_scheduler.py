@@ -0,0 +1,49 @@
+# tests/test_scheduler.py
+# Study windows from any source must not break the local scheduler.
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from agents import preferences
+from agents.preferences import PreferenceStore, remember
+from agents.scheduler import WEEKDAY_WINDOW, build_agenda
+
+PLAN = {"goal": "LLMs", "duration": "1 week", "plan": [{"week": "Week 1", "focus": "Basics", "tasks": ["Read"]}]}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = PreferenceStore(tmp_path / "preferences.db")
+    monkeypatch.setattr(preferences, "get_store", lambda: store)
+    return store
+
+
+def monday_time(agenda):
+    return agenda["days"][0]["blocks"][0]["time"]
+
+
+@pytest.mark.parametrize("window, expected", [
+    ("7pm-9pm", "19:00–21:00"),
+    ("19:00-21:00", "19:00–21:00"),
+    ("whenever I can", WEEKDAY_WINDOW),
+    (None, WEEKDAY_WINDOW),
+])
+def test_build_agenda_normalizes_or_falls_back(window, expected):
+    assert monday_time(build_agenda(PLAN, study_window=window)) == expected
+
+
+def test_model_memory_update_is_stored_normalized(store):
+    context = SimpleNamespace(user_id="u1", state={})
+    remember(context, {"study_window": "7pm-9pm"})
+    assert store.get("u1", "study_window") == "19:00–21:00"
+    assert context.state["study_window"] == "19:00–21:00"
+
+
+def test_unparseable_window_is_not_stored(store):
+    context = SimpleNamespace(user_id="u1", state={})
+    remember(context, {"study_window": "evenings"})
+    assert store.get("u1") == {}
+    assert context.state == {}
@@ -0,0 +1,45 @@
+# tests/test_streaming.py
+# The SSE endpoint drives stream_run through `pump` (agents/streaming.py).
+
+import asyncio
+import contextvars
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from agents.streaming import pump
+
+span = contextvars.ContextVar("span", default=None)
+
+
+async def steps():
+    span.set("orchestrator")
+    yield {"event": "partial", "data": {}}
+    # A tracing span opened in the first step must still be current here
+    yield {"event": "final", "data": {"span": span.get()}}
+
+
+async def failing():
+    yield {"event": "partial", "data": {}}
+    raise RuntimeError("model down")
+
+
+async def drain(events):
+    queue = asyncio.Queue()
+    await asyncio.create_task(pump(events, queue))
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_context_set_in_one_step_is_seen_by_the_next():
+    items = asyncio.run(drain(steps()))
+    assert items[1]["data"]["span"] == "orchestrator"
+    assert items[-1] is None
+
+
+def test_errors_are_handed_to_the_reader():
+    items = asyncio.run(drain(failing()))
+    assert isinstance(items[-1], RuntimeError)
@@ -0,0 +1,47 @@
+# tests/test_task_store.py
+# SQLite task store (tools/task_store.py) and the task operations built
+# on it (agents/task_manager.py).
+
+import asyncio
+import threading
+
+import pytest
+
+from tools.task_store import TaskStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TaskStore(path=tmp_path / "tasks.db", legacy_json=None)
+
+
+def test_text_filter_matches_like_wildcards_literally(store):
+    for title in ("Finish 100% of module 1", "Finish 1000 flashcards", "read_me notes", "readme notes"):
+        store.add(title)
+
+    assert [t["title"] for t in store.query(text="100%")[0]] == ["Finish 100% of module 1"]
+    assert [t["title"] for t in store.query(text="read_me")[0]] == ["read_me notes"]
+    assert store.query(text="finish")[1] == 2
+
+
+def test_task_operations_run_the_store_off_the_event_loop(store, monkeypatch):
+    pytest.importorskip("google.adk")
+    from agents import task_manager
+
+    threads = []
+
+    class SpyStore:
+        def add(self, title, details=""):
+            threads.append(threading.current_thread())
+            return store.add(title, details)
+
+    monkeypatch.setattr(task_manager, "get_store", SpyStore)
+
+    async def scenario():
+        loop_thread = threading.current_thread()
+        result = await task_manager.add_task("Review notes")
+        return loop_thread, result
+
+    loop_thread, result = asyncio.run(scenario())
+    assert result["added"]["title"] == "Review notes"
+    assert threads and threads[0] is not loop_thread
@@ -0,0 +1,46 @@
+# tests/test_tracing.py
+# Span export (agents/tracing.py) must stay off the request path.
+
+import json
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from agents.stats import percentile
+from agents.tracing import Tracer, load_spans, summarize
+
+
+def test_end_queues_the_span_and_close_writes_it(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path))
+
+    parent = tracer.start("agent", "OrchestratorAgent")
+    child = tracer.start("tool", "planning_agent")
+    tracer.end(child)
+    tracer.end(parent)
+
+    assert [s["name"] for s in tracer.recent] == ["planning_agent", "OrchestratorAgent"]
+
+    tracer.close()
+    spans = load_spans(str(path))
+    assert [s["name"] for s in spans] == ["planning_agent", "OrchestratorAgent"]
+    assert spans[0]["parent_id"] == spans[1]["span_id"]
+    assert all("_t0" not in json.dumps(s) for s in spans)
+    assert tracer.stats()["written"] == 2
+
+
+def test_tracer_without_path_keeps_spans_in_memory():
+    tracer = Tracer(path=None)
+    tracer.end(tracer.start("llm", "gemini"))
+    assert tracer.summary()[0]["count"] == 1
+    assert tracer.stats() == {}
+
+
+def test_summary_p95_is_the_shared_nearest_rank_percentile():
+    durations = [float(ms) for ms in range(1, 21)]
+    spans = [{"kind": "llm", "name": "PlanningAgent", "duration_ms": ms} for ms in durations]
+
+    assert percentile(durations, 95) == 19.0
+    assert percentile([], 95) == 0.0
+    assert summarize(spans)[0]["p95_ms"] == percentile(durations, 95)
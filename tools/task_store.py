@@ -0,0 +1,287 @@
+
+# Indexed, concurrency-safe task store (SQLite backend)
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DB_PATH = Path("tasks.db")
+LEGACY_JSON_PATH = Path("tasks.json")
+MAX_PAGE_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    title      TEXT    NOT NULL,
+    details    TEXT    NOT NULL DEFAULT '',
+    done       INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_done ON tasks(done);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row_to_task(row: sqlite3.Row) -> Dict[str, Any]:
+    """
+    Unified task shape shared by TaskManagerAgent and TaskTool:
+    {
+      "id": int,
+      "title": str,
+      "details": str,
+      "done": bool,
+      "created_at": str
+    }
+    """
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "details": row["details"],
+        "done": bool(row["done"]),
+        "created_at": row["created_at"],
+    }
+
+
+class TaskStore:
+    """
+    SQLite-backed task store.
+
+    - Stable integer IDs (AUTOINCREMENT, never reused).
+    - Every write runs in a BEGIN IMMEDIATE transaction, so concurrent
+      writers (threads or processes) serialise instead of clobbering
+      each other's whole-file rewrites.
+    - WAL journal: readers never block the writer.
+    """
+
+    def __init__(self, path=DB_PATH, legacy_json=LEGACY_JSON_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        with self._lock, self._reader() as conn:
+            conn.executescript(SCHEMA)
+
+        if legacy_json is not None:
+            self._migrate_json(Path(legacy_json))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    @contextmanager
+    def _reader(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _migrate_json(self, path: Path) -> None:
+        """One-off import of a legacy tasks.json (either schema)."""
+        if not path.exists():
+            return
+
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                return
+
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = []
+            if isinstance(data, dict):
+                data = data.get("tasks", [])
+
+            for item in data if isinstance(data, list) else []:
+                if not isinstance(item, dict):
+                    continue
+                title = item.get("title") or item.get("description") or ""
+                if not title:
+                    continue
+                conn.execute(
+                    "INSERT INTO tasks (title, details, done, created_at) VALUES (?, ?, ?, ?)",
+                    (title, item.get("details", ""), int(bool(item.get("done", False))), _now()),
+                )
+
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (str(path),))
+
+    # -----------------------------------------------------
+    # Writes
+    # -----------------------------------------------------
+    def add(self, title: str, details: str = "") -> Dict[str, Any]:
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO tasks (title, details, done, created_at) VALUES (?, ?, 0, ?)",
+                (title, details, _now()),
+            )
+            row = conn.execute("SELECT * FROM tasks WHERE id = ?", (cur.lastrowid,)).fetchone()
+        return _row_to_task(row)
+
+    def set_done(self, task_id: int, done: bool = True) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            conn.execute("UPDATE tasks SET done = ? WHERE id = ?", (int(done), task_id))
+            row = conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def delete(self, task_id: int) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        return _row_to_task(row)
+
+    def add_many(self, titles: Iterable[str]) -> List[Dict[str, Any]]:
+        with self._transaction() as conn:
+            ids = [
+                conn.execute(
+                    "INSERT INTO tasks (title, details, done, created_at) VALUES (?, '', 0, ?)",
+                    (title, _now()),
+                ).lastrowid
+                for title in titles
+                if title
+            ]
+            rows = _fetch_ids(conn, ids)
+        return [_row_to_task(r) for r in rows]
+
+    def set_done_many(self, task_ids: Iterable[int], done: bool = True) -> List[int]:
+        """Returns the ids that actually exist (and were updated)."""
+        task_ids = list(task_ids)
+        with self._transaction() as conn:
+            found = [r["id"] for r in _fetch_ids(conn, task_ids)]
+            conn.executemany("UPDATE tasks SET done = ? WHERE id = ?", [(int(done), i) for i in found])
+        return found
+
+    def delete_many(self, task_ids: Iterable[int]) -> List[int]:
+        """Returns the ids that actually existed (and were deleted)."""
+        task_ids = list(task_ids)
+        with self._transaction() as conn:
+            found = [r["id"] for r in _fetch_ids(conn, task_ids)]
+            conn.executemany("DELETE FROM tasks WHERE id = ?", [(i,) for i in found])
+        return found
+
+    def replace_all(self, tasks: Iterable[Dict[str, Any]]) -> None:
+        """Atomically replace the whole task list (legacy save_tasks semantics)."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tasks")
+            for t in tasks:
+                conn.execute(
+                    "INSERT INTO tasks (id, title, details, done, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        t.get("id"),
+                        t.get("title") or t.get("description") or "",
+                        t.get("details", ""),
+                        int(bool(t.get("done", False))),
+                        t.get("created_at") or _now(),
+                    ),
+                )
+
+    # -----------------------------------------------------
+    # Reads
+    # -----------------------------------------------------
+    def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        with self._reader() as conn:
+            row = conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._reader() as conn:
+            rows = conn.execute("SELECT * FROM tasks ORDER BY id").fetchall()
+        return [_row_to_task(r) for r in rows]
+
+    def query(
+        self,
+        status: str = "all",
+        text: str = "",
+        since: str = "",
+        until: str = "",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Filtered, paginated read.
+
+        status: "all" | "done" | "pending"
+        text:   case-insensitive substring of title or details
+        since / until: ISO dates (inclusive) compared against created_at
+        Returns (tasks for this page, total matching tasks).
+        """
+        clauses, params = [], []
+
+        if status == "done":
+            clauses.append("done = 1")
+        elif status == "pending":
+            clauses.append("done = 0")
+        if text:
+            # Match % and _ literally: they are LIKE wildcards
+            pattern = "%" + _escape_like(text) + "%"
+            clauses.append("(title LIKE ? ESCAPE '\\' OR details LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            # Dates without a time part include the whole day
+            clauses.append("created_at <= ?")
+            params.append(until if "T" in until else until + "T23:59:59Z")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+
+        with self._reader() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM tasks {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM tasks {where} ORDER BY id LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        return [_row_to_task(r) for r in rows], total
+
+
+def _fetch_ids(conn: sqlite3.Connection, task_ids: List[int]) -> List[sqlite3.Row]:
+    if not task_ids:
+        return []
+    marks = ",".join("?" for _ in task_ids)
+    return conn.execute(f"SELECT * FROM tasks WHERE id IN ({marks}) ORDER BY id", list(task_ids)).fetchall()
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def compact(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Small result shape for tool payloads: id, title, done."""
+    return {"id": task["id"], "title": task["title"], "done": task["done"]}
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+
+@lru_cache(maxsize=1)
+def get_store() -> TaskStore:
+    """Process-wide default store (tasks.db, seeded from tasks.json once)."""
+    return TaskStore()
@@ -1,39 +1,29 @@
 
 # Create the ADK Tools for Task Management
 
-import json
-from pathlib import Path
 from typing import Any, Dict, List
 
-TASKS_PATH = Path("tasks.json")
+from tools.task_store import get_store
 
 
 def load_tasks() -> List[Dict[str, Any]]:
     """
-    Load tasks from tasks.json.
+    Load tasks from the shared task store.
     Returns a list of tasks; each task is a dict:
     {
       "id": int,
-      "description": str,
-      "done": bool
+      "title": str,
+      "details": str,
+      "done": bool,
+      "created_at": str
     }
     """
-    if not TASKS_PATH.exists():
-        return []
-
-    try:
-        with TASKS_PATH.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, list):
-            return data
-        return []
-    except Exception:
-        return []
+    return get_store().list()
 
 
 def save_tasks(tasks: List[Dict[str, Any]]) -> None:
     """
-    Save tasks list back to tasks.json.
+    Replace the stored task list in a single transaction.
+    Prefer the per-task TaskStore methods; this exists for bulk rewrites.
     """
-    with TASKS_PATH.open("w", encoding="utf-8") as f:
-        json.dump(tasks, f, ensure_ascii=False, indent=2)
+    get_store().replace_all(tasks)
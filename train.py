@@ -115,7 +115,7 @@ def main():
         f"Registered model name in MLflow Model Registry: {REGISTERED_MODEL_NAME}\n"
     )
     print(
-        "Next step: open MLflow UI, compare runs, and set the best model to 'Production'."
+        "Next step: run `python promote.py` to score all registered versions and promote the best one to 'Production'."
     )
 
 